@@ -1,45 +1,188 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
+from contextlib import asynccontextmanager
+import json
+import mimetypes
 import os
-from src.agent.main import run_agent
+from src.agent.main import run_agent_async, stream_agent_async
+from src.graphql_client.client import close_client
+from src.reporting.downloads import (
+    accepts_gzip,
+    etag_cache,
+    etag_matches,
+    precompressed_variant,
+    safe_report_path,
+)
+from src.reporting.jobs import report_jobs
+from src.reporting.storage import report_storage
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Releases what the agent holds when the server stops: the pooled GraphQL
+    connections, the report worker processes (after running reports finish)
+    and the reports index.
+    """
+    yield
+    close_client()
+    await run_in_threadpool(report_jobs.shutdown)
+    await run_in_threadpool(report_storage.close)
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 class UserRequest(BaseModel):
     prompt: str
 
 
+def _add_links(http_request: Request, response: dict, kind: str = None):
+    """
+    Returns a copy of a response or stream event with the download URL of a
+    report, or the status and download URLs of a background job, added. The
+    agent's own dict is left alone, since the prompt cache may hold it.
+    """
+    response = dict(response)
+    kind = kind or response.get("type")
+    if kind == "report":
+        # Construct the full download URL
+        file_path = response.get("path", "")
+        download_url = http_request.url_for(
+            "download_report", filename=os.path.basename(file_path)
+        )
+        response["download_url"] = str(download_url)
+    elif kind == "job":
+        job_id = response["job_id"]
+        response["status_url"] = str(
+            http_request.url_for("report_job_status", job_id=job_id)
+        )
+        response["download_url"] = str(
+            http_request.url_for("download_report_job", job_id=job_id)
+        )
+    return response
+
+
 @app.post("/ask_agent/")
-async def ask_agent(request: UserRequest):
+async def ask_agent(request: UserRequest, http_request: Request):
     """
     Endpoint to send a natural language prompt to the intelligent agent.
     """
     try:
-        response = run_agent(request.prompt)
+        # The agent awaits the model and runs its tools on worker threads, so
+        # the event loop stays free for other requests.
+        response = await run_agent_async(request.prompt)
         # If the response is a report, we need to convert the path to a download URL
-        if response.get("type") == "report":
-            # Construct the full download URL
-            file_path = response.get("path", "")
-            download_url = f"http://127.0.0.1:8000/{file_path}"
-            response["download_url"] = download_url
-        return response
+        return _add_links(http_request, response)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _frame(event: str, data: dict):
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+@app.post("/ask_agent/stream")
+async def ask_agent_stream(request: UserRequest, http_request: Request):
+    """
+    Endpoint to send a prompt to the agent and follow its progress as
+    Server-Sent Events: model text (`token`), tool calls (`tool_start`,
+    `tool_end`), reports as soon as they are written (`report`, `job`), and
+    then the final response (`done`, same body as /ask_agent/) or `error`.
+    """
+
+    async def frames():
+        try:
+            async for event, data in stream_agent_async(request.prompt):
+                if event in ("report", "job", "done"):
+                    data = _add_links(
+                        http_request, data, None if event == "done" else event
+                    )
+                yield _frame(event, data)
+        except Exception as e:
+            yield _frame("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        frames(),
+        media_type="text/event-stream",
+        # Keep proxies from buffering or caching the stream.
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.get("/")
 async def read_root():
     return {"message": "Welcome to the Medical Report Agent Backend! Use /ask_agent/ to interact with the agent."}
 
 
+async def _report_response(request: Request, file_path: str):
+    """
+    Serves a report with a strong ETag, 304 answers to If-None-Match, Range
+    support for resumed downloads and a gzip copy for clients that accept it.
+    """
+    headers = {"Vary": "Accept-Encoding"}
+    media_type = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+    served_path = file_path
+    if accepts_gzip(request.headers.get("accept-encoding")):
+        compressed = await run_in_threadpool(precompressed_variant, file_path)
+        if compressed is not None:
+            served_path = compressed
+            headers["Content-Encoding"] = "gzip"
+
+    report_storage.touch(file_path, downloaded=True)
+    etag = await run_in_threadpool(etag_cache.get, served_path)
+    headers["ETag"] = etag
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(
+        served_path,
+        media_type=media_type,
+        filename=os.path.basename(file_path),
+        headers=headers,
+    )
+
+
+@app.get("/reports/")
+async def list_reports():
+    """
+    Endpoint to list the stored reports, most recently used first.
+    """
+    return {"reports": report_storage.list()}
+
+
 @app.get("/reports/{filename}")
-async def download_report(filename: str):
+async def download_report(filename: str, request: Request):
     """
     Endpoint to download a generated report.
     """
-    file_path = f"reports/{filename}"
-    if not os.path.exists(file_path):
+    file_path = safe_report_path(filename)
+    if file_path is None:
         raise HTTPException(status_code=404, detail="File not found")
-    return FileResponse(file_path)
+    return await _report_response(request, file_path)
+
+
+@app.get("/jobs/{job_id}")
+async def report_job_status(job_id: str):
+    """
+    Endpoint to check the status and progress of a background report.
+    """
+    status = report_jobs.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return status
+
+
+@app.get("/jobs/{job_id}/download")
+async def download_report_job(job_id: str, request: Request):
+    """
+    Endpoint to download the report produced by a finished background job.
+    """
+    status = report_jobs.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if status["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"Job is {status['status']}")
+    return await _report_response(request, status["path"])
@@ -1,10 +1,18 @@
+import asyncio
+import contextvars
 import google.generativeai as genai
 import os
+import time
+from collections.abc import Mapping, Sequence
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 from src.agent.tools import (
     execute_graphql_query,
     generar_pdf_tool,
     generar_excel_tool,
+    generar_csv_tool,
+    generar_jsonl_tool,
+    generar_parquet_tool,
     get_especialidades,
     get_especialidad_por_id,
     get_usuarios,
@@ -15,8 +23,15 @@ from src.agent.tools import (
     get_citas_por_medico,
     get_diagnosticos_por_paciente,
     get_triajes_por_paciente,
+    get_resumen_paciente,
     get_horarios_disponibles,
 )
+from src.agent.prompt_cache import prompt_cache, response_ttl
+from src.agent.results import shaped_tool
+from src.agent.router import route
+from src.graphql_client.cache import is_mutation
+from src.graphql_client.resilience import deadline
+from src.reporting.generator import PARQUET_DISPONIBLE
 
 load_dotenv()  # Load environment variables from .env file
 
@@ -28,24 +43,59 @@ if not api_key:
 
 genai.configure(api_key=api_key)
 
+# Time budget in seconds shared by every GraphQL call made while answering one
+# prompt, so a hung backend cannot pin a worker indefinitely.
+AGENT_REQUEST_DEADLINE = float(os.getenv("AGENT_REQUEST_DEADLINE", "60"))
+# Tool calls requested together by the model run concurrently on this many
+# threads (shared by all requests).
+AGENT_TOOL_WORKERS = int(os.getenv("AGENT_TOOL_WORKERS", "8"))
+# Model turns with tool calls allowed per prompt before giving up.
+AGENT_MAX_TOOL_ROUNDS = int(os.getenv("AGENT_MAX_TOOL_ROUNDS", "10"))
+# End the turn as soon as a report tool succeeds instead of asking the model
+# for a closing message.
+AGENT_FINISH_ON_REPORT = os.getenv("AGENT_FINISH_ON_REPORT", "true").lower() == "true"
+
 # Define the tools that the agent can use.
-# We provide the function directly to the model.
-tools = [
-    execute_graphql_query,
+# We provide the function directly to the model. Data tools are wrapped so their
+# results are shaped into compact tables before going back to the model; when a
+# table is truncated, the full rows stay server-side under a handle.
+report_tools = [
     generar_pdf_tool,
     generar_excel_tool,
-    get_especialidades,
-    get_especialidad_por_id,
-    get_usuarios,
-    get_medicos,
-    get_usuarios_por_especialidad,
-    get_citas,
-    get_citas_por_usuario,
-    get_citas_por_medico,
-    get_diagnosticos_por_paciente,
-    get_triajes_por_paciente,
-    get_horarios_disponibles,
+    generar_csv_tool,
+    generar_jsonl_tool,
 ]
+# Parquet export needs the optional pyarrow package; without it the model is
+# not offered a tool that can only fail.
+if PARQUET_DISPONIBLE:
+    report_tools.append(generar_parquet_tool)
+
+tools = (
+    [shaped_tool(execute_graphql_query)]
+    + report_tools
+    + [
+        shaped_tool(tool)
+        for tool in (
+            get_especialidades,
+            get_especialidad_por_id,
+            get_usuarios,
+            get_medicos,
+            get_usuarios_por_especialidad,
+            get_citas,
+            get_citas_por_usuario,
+            get_citas_por_medico,
+            get_diagnosticos_por_paciente,
+            get_triajes_por_paciente,
+            get_resumen_paciente,
+            get_horarios_disponibles,
+        )
+    ]
+)
+
+tools_by_name = {tool.__name__: tool for tool in tools}
+tool_executor = ThreadPoolExecutor(
+    max_workers=AGENT_TOOL_WORKERS, thread_name_prefix="agent-tool"
+)
 
 # Create the generative model with the defined tools
 model = genai.GenerativeModel(model_name="gemini-2.5-flash", tools=tools)
@@ -55,51 +105,340 @@ def run_agent(prompt: str) -> dict:
     """
     Runs the agent with a given prompt.
 
+    Repeated prompts, including differently worded ones with the same key
+    terms, are answered from the prompt cache for as long as the data behind
+    the answer is considered fresh. Simple lookups ("lista de especialidades",
+    "citas del médico 5") are answered by calling the tool directly.
+
     Args:
         prompt (str): The user's request in natural language.
 
     Returns:
         dict: A structured response. Can be:
         - `{"type": "text", "content": "..."}` for a text response.
-        - `{"type": "report", "format": "pdf|excel", "path": "reports/file.pdf"}` for a report.
+        - `{"type": "report", "format": "pdf|excel|csv|jsonl|parquet", "path": "reports/file.pdf", "rows": 42}` for a report.
+        - `{"type": "job", "job_id": "job_...", "status": "queued", "rows": 42}` for a report rendered in the background.
+    """
+    for event, data in stream_agent(prompt):
+        if event == "done":
+            return data
+
+
+async def run_agent_async(prompt: str) -> dict:
+    """
+    Async version of `run_agent`, for callers on an event loop.
+    """
+    async for event, data in stream_agent_async(prompt):
+        if event == "done":
+            return data
+
+
+def stream_agent(prompt: str):
+    """
+    Runs the agent with a given prompt, yielding its progress as it happens.
+
+    Args:
+        prompt (str): The user's request in natural language.
+
+    Yields:
+        tuple: `(event, data)` pairs:
+        - `("token", {"text": "..."})` for each piece of model text.
+        - `("tool_start", {"name": "...", "args": {...}})` when a tool call starts.
+        - `("tool_end", {"name": "...", "ok": True})` when it finishes.
+        - `("report", {...})` or `("job", {...})` as soon as a report tool has
+          written a file or queued a job, with the same body as the response.
+        - `("done", response)` last, with the response `run_agent` returns.
     """
     print(f"User prompt: {prompt}")
 
-    # Start a chat session
-    chat = model.start_chat(enable_automatic_function_calling=True)
-
-    # Send the prompt to the model
-    response = chat.send_message(prompt)
-
-    # The model will automatically call the necessary functions.
-    # The response will contain the final result after the function calls.
-
-    # We just need to get the text part of the final response.
-    final_response = ""
-    for chunk in response:
-        if chunk.text:
-            final_response += chunk.text
-
-    # Check if a report was generated by looking for the log messages
-    # This is a simple check. A more robust implementation would parse the function call results.
-    if "PDF report generated:" in final_response:
-        # Extract the file path from the log message
-        # This is a very naive way to do it. In a real scenario, you would parse the function call result.
-        parts = final_response.split("PDF report generated: ")
-        if len(parts) > 1:
-            file_path = parts[1].split("\n")[0].strip()
-            return {"type": "report", "format": "pdf", "path": file_path}
-    elif "Excel report generated:" in final_response:
-        # Extract the file path from the log message
-        parts = final_response.split("Excel report generated: ")
-        if len(parts) > 1:
-            file_path = parts[1].split("\n")[0].strip()
-            return {"type": "report", "format": "excel", "path": file_path}
+    cached = _cached_response(prompt)
+    if cached is not None:
+        yield "done", cached
+        return
+
+    # Prompts that map directly to one tool skip the model altogether.
+    with deadline(AGENT_REQUEST_DEADLINE):
+        routed = route(prompt)
+    if routed is not None:
+        response, tool_name = routed
+        tools_called = [(tool_name, {})]
+    else:
+        tools_called = []
+        response = yield from _chat_events(prompt, tools_called)
+    _remember(prompt, response, tools_called)
+    yield "done", response
+
+
+async def stream_agent_async(prompt: str):
+    """
+    Async version of `stream_agent`, yielding the same events.
+
+    The model is awaited through the SDK's async API, so a prompt waiting on
+    Gemini holds no thread. Routing and tool calls use the blocking GraphQL
+    client and run on the tool threads, never on the event loop.
+    """
+    print(f"User prompt: {prompt}")
+
+    cached = _cached_response(prompt)
+    if cached is not None:
+        yield "done", cached
+        return
+
+    expires_at = time.monotonic() + AGENT_REQUEST_DEADLINE
+    routed = await asyncio.get_running_loop().run_in_executor(
+        tool_executor, _within_deadline, expires_at, route, prompt
+    )
+    if routed is not None:
+        response, tool_name = routed
+        tools_called = [(tool_name, {})]
+    else:
+        tools_called = []
+        async for event, data in _chat_events_async(prompt, tools_called, expires_at):
+            if event == "done":
+                response = data
+            else:
+                yield event, data
+    _remember(prompt, response, tools_called)
+    yield "done", response
+
+
+def _cached_response(prompt):
+    cached = prompt_cache.get(prompt)
+    if cached is None or not _still_available(cached):
+        return None
+    print("Answered from the prompt cache")
+    return cached
+
+
+def _remember(prompt, response, tools_called):
+    # Background jobs are one-off, and an answer that wrote data must not be
+    # replayed without writing it again.
+    if response["type"] != "job" and not _wrote_data(tools_called):
+        ttl = response_ttl([name for name, _ in tools_called])
+        prompt_cache.set(prompt, response, ttl)
+
+
+def _still_available(response):
+    # A cached report is only useful while its file has not been cleaned up.
+    return response["type"] != "report" or os.path.exists(response["path"])
+
+
+def _wrote_data(tools_called):
+    return any(
+        name == "execute_graphql_query" and is_mutation(args.get("query") or "")
+        for name, args in tools_called
+    )
+
+
+def _within_deadline(expires_at, fn, *args):
+    # Tool threads start from an empty context, so the request's deadline is
+    # set again around the call.
+    with deadline(expires_at - time.monotonic()):
+        return fn(*args)
+
+
+def _plain(value):
+    """
+    Converts the protobuf maps and lists of function call arguments into
+    plain dicts and lists.
+    """
+    if isinstance(value, Mapping):
+        return {key: _plain(item) for key, item in value.items()}
+    if isinstance(value, Sequence) and not isinstance(value, (str, bytes)):
+        return [_plain(item) for item in value]
+    return value
+
+
+def _call_tool(name, args):
+    tool = tools_by_name.get(name)
+    if tool is None:
+        return {"error": f"Unknown tool: {name}"}
+    try:
+        result = tool(**args)
+    except Exception as e:
+        print(f"Error calling {name}: {e}")
+        return {"error": str(e)}
+    return result if isinstance(result, dict) else {"result": result}
+
+
+def _report_result(result):
+    """
+    Returns the structured result of a report tool that wrote a report or
+    queued a job, or None for any other result.
+    """
+    if result.get("type") in ("report", "job"):
+        return {key: value for key, value in result.items() if key != "message"}
+    return None
+
+
+def _tool_end_events(name, result, reports):
+    """
+    Yields the events of a finished tool call, appending the report it wrote
+    or queued, if any, to `reports`.
+    """
+    yield "tool_end", {"name": name, "ok": "error" not in result}
+    report = _report_result(result)
+    if report is not None:
+        reports.append(report)
+        # The event gets its own copy: consumers may add to it while the
+        # report becomes the cached response.
+        yield report["type"], dict(report)
+
+
+def _function_responses(calls, results):
+    return [
+        genai.protos.Part(
+            function_response=genai.protos.FunctionResponse(name=name, response=result)
+        )
+        for (name, _), result in zip(calls, results)
+    ]
+
+
+def _final_response(text, reports):
+    # We just need the text of the final response.
+    final_response = "".join(text)
+
+    # Reports come from the report tools' results, not from the model's text.
+    if reports:
+        response = reports[-1]
+        if final_response:
+            response = dict(response, message=final_response)
+        return response
 
     # If no report was generated, return the text response
     return {"type": "text", "content": final_response}
 
 
+def _call_tools(function_calls, tools_called, reports):
+    """
+    Runs the function calls of one model response concurrently, yielding
+    their start and end events, and returns their results, in order, as
+    function response parts. Reports written or queued by the calls are
+    appended to `reports`.
+    """
+    calls = [(call.name, _plain(call.args)) for call in function_calls]
+    tools_called.extend(calls)
+    futures = []
+    for name, args in calls:
+        yield "tool_start", {"name": name, "args": args}
+        # Worker threads do not inherit context variables, so each call gets
+        # a copy of the caller's context and with it the request deadline.
+        futures.append(
+            tool_executor.submit(contextvars.copy_context().run, _call_tool, name, args)
+        )
+
+    names = {future: name for future, (name, _) in zip(futures, calls)}
+    for future in as_completed(futures):
+        yield from _tool_end_events(names[future], future.result(), reports)
+
+    return _function_responses(calls, [future.result() for future in futures])
+
+
+async def _call_tools_async(function_calls, tools_called, reports, expires_at):
+    """
+    Async version of `_call_tools`. Its last event is `("parts", [...])` with
+    the function response parts.
+    """
+    calls = [(call.name, _plain(call.args)) for call in function_calls]
+    tools_called.extend(calls)
+    loop = asyncio.get_running_loop()
+
+    async def run(index, name, args):
+        result = await loop.run_in_executor(
+            tool_executor, _within_deadline, expires_at, _call_tool, name, args
+        )
+        return index, result
+
+    tasks = []
+    for index, (name, args) in enumerate(calls):
+        yield "tool_start", {"name": name, "args": args}
+        tasks.append(asyncio.ensure_future(run(index, name, args)))
+
+    results = [None] * len(calls)
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            index, result = await next_done
+            results[index] = result
+            for event in _tool_end_events(calls[index][0], result, reports):
+                yield event
+    finally:
+        # The caller went away: stop waiting for the calls still running.
+        for task in tasks:
+            task.cancel()
+
+    yield "parts", _function_responses(calls, results)
+
+
+def _chat_events(prompt: str, tools_called: list):
+    """
+    Asks the model, streaming its text and running the tools it calls, and
+    returns the structured response. The tool calls made are appended to
+    `tools_called`.
+    """
+    # Start a chat session. Function calls are handled below rather than by
+    # the SDK, which would run them one after another.
+    chat = model.start_chat()
+
+    # Send the prompt to the model. Tool calls made while answering share the
+    # request's deadline budget.
+    content = prompt
+    reports = []
+    with deadline(AGENT_REQUEST_DEADLINE):
+        for round_number in range(AGENT_MAX_TOOL_ROUNDS + 1):
+            text = []
+            function_calls = []
+            for chunk in chat.send_message(content, stream=True):
+                for part in chunk.parts:
+                    if part.function_call.name:
+                        function_calls.append(part.function_call)
+                    elif part.text:
+                        text.append(part.text)
+                        yield "token", {"text": part.text}
+            if not function_calls or round_number == AGENT_MAX_TOOL_ROUNDS:
+                break
+            content = yield from _call_tools(function_calls, tools_called, reports)
+            # Once a report is written the answer is known, so the model is
+            # not asked to restate its path.
+            if reports and AGENT_FINISH_ON_REPORT:
+                return reports[-1]
+
+    return _final_response(text, reports)
+
+
+async def _chat_events_async(prompt: str, tools_called: list, expires_at: float):
+    """
+    Async version of `_chat_events`. Its last event is `("done", response)`.
+    """
+    chat = model.start_chat()
+
+    content = prompt
+    reports = []
+    for round_number in range(AGENT_MAX_TOOL_ROUNDS + 1):
+        text = []
+        function_calls = []
+        async for chunk in await chat.send_message_async(content, stream=True):
+            for part in chunk.parts:
+                if part.function_call.name:
+                    function_calls.append(part.function_call)
+                elif part.text:
+                    text.append(part.text)
+                    yield "token", {"text": part.text}
+        if not function_calls or round_number == AGENT_MAX_TOOL_ROUNDS:
+            break
+        async for event, data in _call_tools_async(
+            function_calls, tools_called, reports, expires_at
+        ):
+            if event == "parts":
+                content = data
+            else:
+                yield event, data
+        if reports and AGENT_FINISH_ON_REPORT:
+            yield "done", reports[-1]
+            return
+
+    yield "done", _final_response(text, reports)
+
+
 if __name__ == "__main__":
     # Example of how to run the agent
     # This prompt should trigger the agent to use the GraphQL tool
@@ -0,0 +1,207 @@
+import copy
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, OrderedDict
+
+# Agent responses kept for repeated prompts, and the trigram similarity (0 to
+# 1) a differently worded prompt needs to reuse a cached answer.
+PROMPT_CACHE_MAX_ENTRIES = int(os.getenv("AGENT_PROMPT_CACHE_MAX_ENTRIES", "500"))
+PROMPT_CACHE_SIMILARITY = float(os.getenv("AGENT_PROMPT_CACHE_SIMILARITY", "0.4"))
+# TTL of answers that did not call any tool.
+PROMPT_CACHE_DEFAULT_TTL = float(os.getenv("AGENT_PROMPT_CACHE_DEFAULT_TTL", "300"))
+
+# How long an answer stays valid, by the tools it used: catalogs change
+# rarely, appointments and schedules change all the time. An answer lives as
+# long as its most volatile tool allows; tools not listed are not cached.
+TOOL_TTLS = {
+    "get_especialidades": 3600,
+    "get_especialidad_por_id": 3600,
+    "get_medicos": 600,
+    "get_usuarios": 300,
+    "get_usuarios_por_especialidad": 300,
+    "get_horarios_disponibles": 60,
+    "get_citas": 60,
+    "get_citas_por_usuario": 60,
+    "get_citas_por_medico": 60,
+    "get_diagnosticos_por_paciente": 60,
+    "get_triajes_por_paciente": 60,
+    "get_resumen_paciente": 60,
+    "execute_graphql_query": 60,
+    "generar_pdf_tool": 60,
+    "generar_excel_tool": 60,
+    "generar_csv_tool": 60,
+    "generar_jsonl_tool": 60,
+    "generar_parquet_tool": 60,
+}
+
+# Words that change how a request is phrased but not what it asks for. Every
+# other word must appear in both prompts for a near match.
+_FILLER_WORDS = set("""
+    a al algun alguna algunos algunas actual actuales como con cual cuales
+    da dame de del dime disponible disponibles el en es esta estan este
+    estos favor hay la las lista listado listar lo los me medica medicas
+    mi mis mostrar muestra muestrame necesito por porfa puedes que quiero
+    registrada registradas registrado registrados se sobre su sus toda todas
+    todo todos un una unos unas ver y
+    """.split())
+
+
+def normalize_prompt(prompt):
+    """
+    Lowercases a prompt, strips accents and punctuation and collapses
+    whitespace, so trivially different spellings share one cache entry.
+    """
+    text = unicodedata.normalize("NFKD", prompt.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(re.findall(r"[a-z0-9@]+(?:[._-][a-z0-9@]+)*", text))
+
+
+def _stem(word):
+    # Light plural folding ("especialidades" -> "especialidad").
+    for suffix in ("es", "s"):
+        if len(word) > 4 and word.endswith(suffix):
+            return word[: -len(suffix)]
+    return word
+
+
+def key_terms(normalized):
+    """
+    Returns the words of a normalized prompt that carry its meaning: entity
+    types, names, IDs and dates. Two prompts can only share an answer if
+    these match exactly.
+    """
+    return frozenset(
+        _stem(word) for word in normalized.split() if word not in _FILLER_WORDS
+    )
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return Counter(padded[i : i + 3] for i in range(len(padded) - 2))
+
+
+def similarity(left, right):
+    """
+    Cosine similarity of the character trigrams of two normalized prompts.
+    """
+    a, b = _trigrams(left), _trigrams(right)
+    dot = sum(count * b[gram] for gram, count in a.items())
+    norm = (sum(v * v for v in a.values()) * sum(v * v for v in b.values())) ** 0.5
+    return dot / norm if norm else 0.0
+
+
+def response_ttl(tools_called, default_ttl=None):
+    """
+    Returns how long an answer may be reused given the tools called to
+    produce it, or None if it must not be cached.
+    """
+    if not tools_called:
+        return PROMPT_CACHE_DEFAULT_TTL if default_ttl is None else default_ttl
+    ttls = [TOOL_TTLS.get(name) for name in tools_called]
+    if None in ttls:
+        return None
+    return min(ttls)
+
+
+class PromptCache:
+    """
+    LRU cache of agent responses keyed by normalized prompt.
+
+    A prompt that is not an exact (normalized) repeat can still reuse a
+    cached answer when it has the same key terms and its wording is similar
+    enough, e.g. "lista de especialidades" and "listado de especialidades
+    médicas".
+    """
+
+    def __init__(self, max_entries=500, min_similarity=0.4):
+        self.max_entries = max_entries
+        self.min_similarity = min_similarity
+        self._entries = OrderedDict()
+        self._by_terms = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def _remove(self, normalized):
+        # Called with the lock held.
+        _, _, terms = self._entries.pop(normalized)
+        group = self._by_terms.get(terms)
+        if group is not None:
+            group.discard(normalized)
+            if not group:
+                del self._by_terms[terms]
+
+    def _lookup(self, normalized):
+        # Called with the lock held. Exact match first, then the most similar
+        # prompt with the same key terms.
+        if normalized in self._entries:
+            return normalized
+        best, best_score = None, self.min_similarity
+        for candidate in self._by_terms.get(key_terms(normalized), ()):
+            score = similarity(normalized, candidate)
+            if score >= best_score:
+                best, best_score = candidate, score
+        return best
+
+    def get(self, prompt):
+        """
+        Returns a copy of the cached response for `prompt`, or None.
+        """
+        normalized = normalize_prompt(prompt)
+        now = time.monotonic()
+        with self._lock:
+            match = self._lookup(normalized)
+            while match is not None and self._entries[match][1] <= now:
+                self._remove(match)
+                match = self._lookup(normalized)
+            if match is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(match)
+            self._hits += 1
+            response = self._entries[match][0]
+        return copy.deepcopy(response)
+
+    def set(self, prompt, response, ttl):
+        """
+        Caches `response` for `prompt` during `ttl` seconds.
+        """
+        if not ttl or ttl <= 0:
+            return
+        normalized = normalize_prompt(prompt)
+        terms = key_terms(normalized)
+        with self._lock:
+            if normalized in self._entries:
+                self._remove(normalized)
+            self._entries[normalized] = (
+                copy.deepcopy(response),
+                time.monotonic() + ttl,
+                terms,
+            )
+            self._by_terms.setdefault(terms, set()).add(normalized)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_terms.clear()
+
+    def stats(self):
+        """
+        Returns hit and miss counters and the number of cached prompts.
+        """
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "entries": len(self._entries),
+            }
+
+
+prompt_cache = PromptCache(
+    max_entries=PROMPT_CACHE_MAX_ENTRIES, min_similarity=PROMPT_CACHE_SIMILARITY
+)
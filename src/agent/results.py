@@ -0,0 +1,319 @@
+import functools
+import json
+import os
+import secrets
+import threading
+import time
+from collections import Counter, OrderedDict
+
+# Limits of what a tool result may put in front of the model. Rows past either
+# budget stay in the result store and are summarized instead.
+MAX_ROWS = int(os.getenv("AGENT_RESULT_MAX_ROWS", "50"))
+MAX_TOKENS = int(os.getenv("AGENT_RESULT_MAX_TOKENS", "4000"))
+
+# How many full result sets are kept server-side, how much memory they may use
+# (measured as JSON bytes), and for how long.
+STORE_MAX_ENTRIES = int(os.getenv("AGENT_RESULT_STORE_MAX_ENTRIES", "200"))
+STORE_MAX_BYTES = int(os.getenv("AGENT_RESULT_STORE_MAX_BYTES", str(64 * 1024 * 1024)))
+STORE_TTL = float(os.getenv("AGENT_RESULT_STORE_TTL", "3600"))
+
+
+class ResultStore:
+    """
+    Keeps full tool results server-side under short handles so report tools
+    can use them without the rows passing through the model.
+
+    The store is bounded by entry count and by the JSON-encoded size of the
+    rows; the least recently used results are evicted first.
+    """
+
+    def __init__(self, max_entries=200, ttl=3600.0, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def put(self, rows, source=None):
+        """
+        Stores a list of rows and returns its handle, or None if the rows alone
+        exceed the byte budget.
+        """
+        size = len(json.dumps(rows, ensure_ascii=False, default=str).encode("utf-8"))
+        if size > self.max_bytes:
+            return None
+        handle = "d_" + secrets.token_hex(4)
+        with self._lock:
+            self._entries[handle] = (rows, source, time.monotonic() + self.ttl, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+        return handle
+
+    def _remove(self, handle):
+        # Called with the lock held.
+        self._bytes -= self._entries.pop(handle)[3]
+
+    def get(self, handle):
+        """
+        Returns the rows stored under `handle`.
+
+        Raises:
+            LookupError: If the handle is unknown or has expired.
+        """
+        with self._lock:
+            entry = self._entries.get(handle)
+            if entry is None or entry[2] <= time.monotonic():
+                if entry is not None:
+                    self._remove(handle)
+                raise LookupError(f"Unknown or expired data handle: {handle}")
+            self._entries.move_to_end(handle)
+            return entry[0]
+
+
+result_store = ResultStore(
+    max_entries=STORE_MAX_ENTRIES, ttl=STORE_TTL, max_bytes=STORE_MAX_BYTES
+)
+
+
+def flatten_row(row, prefix=""):
+    """
+    Flattens nested objects into dotted keys ({"paciente": {"username": "x"}}
+    becomes {"paciente.username": "x"}). Lists are joined into one string per
+    leaf field.
+    """
+    flat = {}
+    for key, value in row.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten_row(value, f"{name}."))
+        elif isinstance(value, list):
+            if value and all(isinstance(item, dict) for item in value):
+                joined = {}
+                for item in value:
+                    for sub_key, sub_value in flatten_row(item, f"{name}.").items():
+                        joined.setdefault(sub_key, []).append(str(sub_value))
+                flat.update({k: ", ".join(v) for k, v in joined.items()})
+            else:
+                flat[name] = ", ".join(str(item) for item in value)
+        else:
+            flat[name] = value
+    return flat
+
+
+def _columns(rows):
+    columns = []
+    seen = set()
+    for row in rows:
+        for key in row:
+            if key not in seen:
+                seen.add(key)
+                columns.append(key)
+    return columns
+
+
+def _estimate_tokens(value):
+    # Roughly four characters per token for JSON-ish text.
+    return len(json.dumps(value, ensure_ascii=False, default=str)) // 4
+
+
+def summarize_columns(rows, columns):
+    """
+    Returns per-column statistics: min/max/mean for numeric columns, distinct
+    count and most frequent values otherwise.
+    """
+    summary = {}
+    for column in columns:
+        values = [row.get(column) for row in rows if row.get(column) is not None]
+        numbers = [
+            v for v in values if isinstance(v, (int, float)) and not isinstance(v, bool)
+        ]
+        if values and len(numbers) == len(values):
+            summary[column] = {
+                "min": min(numbers),
+                "max": max(numbers),
+                "mean": round(sum(numbers) / len(numbers), 2),
+            }
+        else:
+            counts = Counter(str(v) for v in values)
+            summary[column] = {
+                "distinct": len(counts),
+                "top": [value for value, _ in counts.most_common(3)],
+            }
+    return summary
+
+
+def shape_rows(rows, source=None, max_rows=None, max_tokens=None):
+    """
+    Turns a list of rows into a compact table for the model.
+
+    The returned table carries at most `max_rows` rows within `max_tokens`.
+    When it had to be truncated, the full, flattened rows are kept in the
+    result store under a handle and column statistics are added; a table
+    returned in full is not stored, since the model already has every row.
+
+    Returns:
+        dict: `total_rows`, `columns`, `rows` (lists of values in column
+        order), `truncated` and, if truncated, `summary` and `handle` (absent
+        if the rows were too large to keep).
+    """
+    max_rows = MAX_ROWS if max_rows is None else max_rows
+    max_tokens = MAX_TOKENS if max_tokens is None else max_tokens
+
+    flat_rows = [
+        flatten_row(row) if isinstance(row, dict) else {"value": row} for row in rows
+    ]
+    columns = _columns(flat_rows)
+    table_rows = [
+        [row.get(column) for column in columns] for row in flat_rows[:max_rows]
+    ]
+
+    shaped = {
+        "total_rows": len(flat_rows),
+        "columns": columns,
+        "rows": table_rows,
+        "truncated": False,
+    }
+    while table_rows and _estimate_tokens(shaped) > max_tokens:
+        del table_rows[len(table_rows) // 2 :]
+    if len(table_rows) < len(flat_rows):
+        shaped["truncated"] = True
+        shaped["summary"] = summarize_columns(flat_rows, columns)
+        handle = result_store.put(flat_rows, source)
+        if handle is not None:
+            shaped["handle"] = handle
+    return shaped
+
+
+def shape_result(result, source=None, max_rows=None, max_tokens=None):
+    """
+    Shapes a GraphQL tool result for the model: every list field becomes a
+    compact table and nested objects are flattened. Errors pass through.
+    """
+    if not isinstance(result, dict) or "data" not in result:
+        return result
+
+    shaped = {key: value for key, value in result.items() if key != "data"}
+    data = {}
+    for field, value in (result.get("data") or {}).items():
+        if isinstance(value, list):
+            data[field] = shape_rows(value, source or field, max_rows, max_tokens)
+        elif isinstance(value, dict):
+            data[field] = flatten_row(value)
+        else:
+            data[field] = value
+    shaped["data"] = data
+    return shaped
+
+
+def shaped_tool(tool):
+    """
+    Wraps a data tool so its result is shaped before it goes back to the model.
+    The wrapper keeps the tool's name, signature and docstring, which is what
+    the model sees.
+    """
+
+    @functools.wraps(tool)
+    def wrapper(*args, **kwargs):
+        return shape_result(tool(*args, **kwargs), source=tool.__name__)
+
+    return wrapper
+
+
+_FILTER_OPERATORS = ("!=", ">=", "<=", "=", ">", "<", "~")
+
+
+def _parse_filter(expression):
+    for operator in _FILTER_OPERATORS:
+        column, found, value = expression.partition(operator)
+        if found:
+            return column.strip(), operator, value.strip()
+    raise ValueError(
+        f"Invalid filter '{expression}'. Use column=value, !=, >, <, >=, <= or ~ (contains)."
+    )
+
+
+def _comparable(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return str(value).lower()
+
+
+def _sort_key(value):
+    # Numbers sort before text and missing values go last, so mixed columns
+    # never compare a float with a string.
+    comparable = _comparable(value)
+    return (value is None, isinstance(comparable, str), comparable)
+
+
+def _matches(row, column, operator, expected):
+    actual = row.get(column)
+    if operator == "~":
+        return expected.lower() in str(actual).lower()
+    left, right = _comparable(actual), _comparable(expected)
+    if operator in ("=", "!="):
+        return (left == right) == (operator == "=")
+    if type(left) is not type(right):
+        return False
+    return {
+        ">": left > right,
+        "<": left < right,
+        ">=": left >= right,
+        "<=": left <= right,
+    }[operator]
+
+
+def select_rows(rows, filtros=None, ordenar_por=None, columnas=None):
+    """
+    Filters, sorts and projects stored rows for a report.
+
+    Args:
+        rows (list[dict]): Flattened rows, as kept in the result store.
+        filtros (list[str], optional): Conditions such as "fecha>=2025-01-01"
+            or "especialidad.nombre=Cardiología"; all must hold.
+        ordenar_por (str, optional): Comma-separated columns; a leading "-"
+            sorts that column in descending order.
+        columnas (list[str], optional): Columns to keep, in order.
+
+    Returns:
+        list[dict]: The selected rows, all with the same columns in the same
+        order (missing values are None).
+
+    Raises:
+        ValueError: If a filter or column is invalid.
+    """
+    all_columns = _columns(rows)
+    available = set(all_columns)
+    conditions = [_parse_filter(expression) for expression in filtros or []]
+    for column, _, _ in conditions:
+        if column not in available:
+            raise ValueError(f"Unknown column '{column}' in filter.")
+    selected = [
+        row
+        for row in rows
+        if all(_matches(row, column, op, value) for column, op, value in conditions)
+    ]
+
+    if ordenar_por:
+        for key in reversed(
+            [part.strip() for part in ordenar_por.split(",") if part.strip()]
+        ):
+            column = key.lstrip("-")
+            if column not in available:
+                raise ValueError(f"Unknown column '{column}' in ordenar_por.")
+            selected.sort(
+                key=lambda row: _sort_key(row.get(column)),
+                reverse=key.startswith("-"),
+            )
+
+    if columnas:
+        missing = [column for column in columnas if column not in available]
+        if missing:
+            raise ValueError(f"Unknown columns: {', '.join(missing)}")
+    # Flattened rows do not all have the same keys (an empty list or a null
+    # object flattens to one key instead of its fields), so every row gets
+    # the same columns in the same order.
+    columns = columnas or all_columns
+    return [{column: row.get(column) for column in columns} for row in selected]
@@ -0,0 +1,177 @@
+import os
+import re
+
+from src.agent.prompt_cache import key_terms, normalize_prompt
+from src.agent.results import shape_rows
+from src.agent.tools import (
+    get_citas,
+    get_citas_por_medico,
+    get_citas_por_usuario,
+    get_diagnosticos_por_paciente,
+    get_especialidad_por_id,
+    get_especialidades,
+    get_medicos,
+    get_resumen_paciente,
+    get_triajes_por_paciente,
+    get_usuarios,
+    get_usuarios_por_especialidad,
+)
+
+# Set to false to send every prompt to the model.
+ROUTER_ENABLED = os.getenv("AGENT_ROUTER_ENABLED", "true").lower() == "true"
+# Rows shown in a routed answer; the rest are summarized in one line.
+ROUTER_MAX_ROWS = int(os.getenv("AGENT_ROUTER_MAX_ROWS", "50"))
+
+# Words that only introduce an ID ("médico con id 5").
+_ID_WORDS = {"id", "numero", "nro", "codigo"}
+_ID_RE = re.compile(r"^(\d+|[0-9a-f]{8}-[0-9a-f-]{27})$")
+
+# Different words for the same entity, after plural folding ("pacientes"
+# folds to "pacient", "triajes" to "triaj").
+_SYNONYMS = {
+    "doctor": "medico",
+    "dr": "medico",
+    "paciente": "usuario",
+    "pacient": "usuario",
+    "triaj": "triaje",
+    "historial": "resumen",
+}
+
+# Prompts a single tool answers, keyed by their key terms (an "{id}" term
+# stands for one ID) -> (tool, ID parameter, what the rows are).
+ROUTES = {
+    frozenset({"especialidad"}): (get_especialidades, None, "especialidades"),
+    frozenset({"especialidad", "{id}"}): (
+        get_especialidad_por_id,
+        "especialidad_id",
+        "especialidad",
+    ),
+    frozenset({"medico"}): (get_medicos, None, "médicos"),
+    frozenset({"medico", "especialidad", "{id}"}): (
+        get_usuarios_por_especialidad,
+        "especialidad_id",
+        "médicos de la especialidad",
+    ),
+    frozenset({"usuario"}): (get_usuarios, None, "usuarios"),
+    frozenset({"cita"}): (get_citas, None, "citas"),
+    frozenset({"cita", "medico", "{id}"}): (
+        get_citas_por_medico,
+        "medico_id",
+        "citas del médico",
+    ),
+    frozenset({"cita", "usuario", "{id}"}): (
+        get_citas_por_usuario,
+        "usuario_id",
+        "citas del paciente",
+    ),
+    frozenset({"diagnostico", "usuario", "{id}"}): (
+        get_diagnosticos_por_paciente,
+        "paciente_id",
+        "diagnósticos del paciente",
+    ),
+    frozenset({"triaje", "usuario", "{id}"}): (
+        get_triajes_por_paciente,
+        "paciente_id",
+        "triajes del paciente",
+    ),
+    frozenset({"resumen", "usuario", "{id}"}): (
+        get_resumen_paciente,
+        "paciente_id",
+        "resumen del paciente",
+    ),
+}
+
+
+def match_route(prompt):
+    """
+    Finds the tool that answers `prompt` on its own.
+
+    A prompt matches only if its key terms are exactly those of a route, so
+    anything with extra conditions (dates, names, report formats, ...) is
+    left to the model.
+
+    Returns:
+        tuple: (tool, kwargs, description), or None if no route matches.
+    """
+    terms = key_terms(normalize_prompt(prompt)) - _ID_WORDS
+    ids = [term for term in terms if _ID_RE.match(term)]
+    if len(ids) > 1:
+        return None
+    words = {_SYNONYMS.get(term, term) for term in terms if term not in ids}
+    if ids:
+        words.add("{id}")
+    route = ROUTES.get(frozenset(words))
+    if route is None:
+        return None
+    tool, id_param, description = route
+    kwargs = {id_param: ids[0]} if id_param else {}
+    return tool, kwargs, description
+
+
+def _format_cell(value):
+    text = "" if value is None else str(value)
+    return text.replace("|", "\\|").replace("\n", " ")
+
+
+def format_rows(rows, description, source=None):
+    """
+    Formats rows as a Markdown table, with at most ROUTER_MAX_ROWS rows.
+    """
+    if not rows:
+        return f"No se encontraron {description}."
+    shaped = shape_rows(rows, source, max_rows=ROUTER_MAX_ROWS)
+    lines = [
+        f"Se encontraron {shaped['total_rows']} {description}:",
+        "",
+        "| " + " | ".join(shaped["columns"]) + " |",
+        "| " + " | ".join("---" for _ in shaped["columns"]) + " |",
+    ]
+    for row in shaped["rows"]:
+        lines.append("| " + " | ".join(_format_cell(v) for v in row) + " |")
+    hidden = shaped["total_rows"] - len(shaped["rows"])
+    if hidden:
+        lines += ["", f"... y {hidden} más."]
+    return "\n".join(lines)
+
+
+def format_result(result, description, source=None):
+    """
+    Turns a tool result into the text of an answer, or returns None if the
+    result is an error the model should explain instead.
+    """
+    if not isinstance(result, dict) or result.get("error") or result.get("errors"):
+        return None
+    data = result.get("data") or {}
+    sections = []
+    for field, value in data.items():
+        if field == "pagination":
+            continue
+        if isinstance(value, list):
+            title = description if len(data) == 1 else f"{field} ({description})"
+            sections.append(format_rows(value, title, source))
+        elif isinstance(value, dict):
+            sections.append(format_rows([value], description, source))
+        else:
+            sections.append(f"No se encontró {description}.")
+    return "\n\n".join(sections) if sections else None
+
+
+def route(prompt):
+    """
+    Answers `prompt` by calling the matching tool directly, without the model.
+
+    Returns:
+        tuple: The structured response and the name of the tool called, or
+        None if the prompt should go to the model.
+    """
+    if not ROUTER_ENABLED:
+        return None
+    match = match_route(prompt)
+    if match is None:
+        return None
+    tool, kwargs, description = match
+    print(f"Routing prompt to {tool.__name__}({kwargs})")
+    content = format_result(tool(**kwargs), description, source=tool.__name__)
+    if content is None:
+        return None
+    return {"type": "text", "content": content}, tool.__name__
@@ -1,5 +1,313 @@
-from src.graphql_client.client import GraphQLClient
-from src.reporting.generator import generar_pdf, generar_excel
+import os
+import re
+
+from src.agent.results import flatten_row, result_store, select_rows
+from src.graphql_client.cache import operation_name
+from src.graphql_client.client import get_client, get_batcher
+from src.graphql_client.errors import GraphQLClientError
+from src.graphql_client.operations import register_operation
+from src.graphql_client.selection import project_query
+from src.reporting.cache import report_cache, report_key
+from src.reporting.generator import (
+    generar_csv,
+    generar_excel,
+    generar_jsonl,
+    generar_parquet,
+    generar_pdf,
+)
+from src.reporting.jobs import report_jobs
+from src.reporting.storage import report_storage
+
+# Query documents used by the high-level tools. They are registered once at
+# import time so the client sends them minified and as persisted queries.
+GET_ESPECIALIDADES_QUERY = register_operation("""
+    query GetEspecialidades {
+        especialidades {
+            id
+            nombre
+        }
+    }
+""")
+
+GET_ESPECIALIDAD_QUERY = register_operation("""
+    query GetEspecialidad($id: ID!) {
+        especialidad(id: $id) {
+            id
+            nombre
+        }
+    }
+""")
+
+GET_USUARIOS_QUERY = register_operation("""
+    query GetUsuarios {
+        usuarios {
+            id
+            username
+            email
+            roles {
+                id
+                nombre
+            }
+        }
+    }
+""")
+
+GET_MEDICOS_QUERY = register_operation("""
+    query GetMedicos {
+        medicos {
+            id
+            username
+            email
+            especialidades {
+                id
+                nombre
+            }
+        }
+    }
+""")
+
+GET_USUARIOS_POR_ESPECIALIDAD_QUERY = register_operation("""
+    query GetUsuariosPorEspecialidad($especialidadId: ID!) {
+        usuariosPorEspecialidad(especialidadId: $especialidadId) {
+            usuarioId
+            usuario
+            especialidad
+            turno
+            horario
+            dia
+            fecha
+            horarioId
+            disponibilidad
+        }
+    }
+""")
+
+GET_CITAS_QUERY = register_operation("""
+    query GetCitas {
+        citas {
+            id
+            usuario {
+                username
+            }
+            medico {
+                username
+            }
+            especialidad {
+                nombre
+            }
+            horario
+            fecha
+            nombreUsuarioLogeado
+        }
+    }
+""")
+
+GET_CITAS_POR_USUARIO_QUERY = register_operation("""
+    query GetCitasPorUsuario($usuarioId: ID!) {
+        citasPorUsuario(usuarioId: $usuarioId) {
+            id
+            usuario {
+                username
+            }
+            medico {
+                username
+            }
+            especialidad {
+                nombre
+            }
+            horario
+            fecha
+            nombreUsuarioLogeado
+        }
+    }
+""")
+
+GET_CITAS_POR_MEDICO_QUERY = register_operation("""
+    query GetCitasPorMedico($medicoId: ID!) {
+        citasPorMedico(medicoId: $medicoId) {
+            id
+            usuario {
+                username
+            }
+            medico {
+                username
+            }
+            especialidad {
+                nombre
+            }
+            horario
+            fecha
+            nombreUsuarioLogeado
+        }
+    }
+""")
+
+GET_DIAGNOSTICOS_POR_PACIENTE_QUERY = register_operation("""
+    query GetDiagnosticosPorPaciente($pacienteId: ID!) {
+        diagnosticosPorPaciente(pacienteId: $pacienteId) {
+            id
+            descripcion
+            tratamiento
+            fecha
+            nombreMedico
+            nombrePaciente
+            especialidad
+        }
+    }
+""")
+
+GET_TRIAJES_POR_PACIENTE_QUERY = register_operation("""
+    query GetTriajesPorPaciente($pacienteId: ID!) {
+        triajesPorPaciente(pacienteId: $pacienteId) {
+            id
+            paciente {
+                username
+            }
+            enfermera {
+                username
+            }
+            temperatura
+            peso
+            estatura
+            frecuenciaCardiaca
+            frecuenciaRespiratoria
+            saturacionOxigeno
+            alergias
+            enfermedadesCronicas
+            motivoConsulta
+            fecha
+        }
+    }
+""")
+
+GET_HORARIOS_DISPONIBLES_QUERY = register_operation("""
+    query GetHorariosDisponibles($especialidadId: ID!, $fecha: Date!) {
+        horariosDisponibles(especialidadId: $especialidadId, fecha: $fecha) {
+            id
+            fecha
+            horaInicio
+            horaFin
+            disponible
+            especialidad {
+                nombre
+            }
+            turno {
+                nombre
+            }
+            dia {
+                nombre
+            }
+        }
+    }
+""")
+
+# Offset-paginated variants of the list queries, for backends whose list
+# fields accept `limit` and `offset` arguments. Whole lists are read through
+# them page by page (see `_all_rows`).
+GET_USUARIOS_PAGINADOS_QUERY = register_operation("""
+    query GetUsuariosPaginados($limit: Int!, $offset: Int!) {
+        usuarios(limit: $limit, offset: $offset) {
+            id
+            username
+            email
+            roles {
+                id
+                nombre
+            }
+        }
+    }
+""")
+
+GET_MEDICOS_PAGINADOS_QUERY = register_operation("""
+    query GetMedicosPaginados($limit: Int!, $offset: Int!) {
+        medicos(limit: $limit, offset: $offset) {
+            id
+            username
+            email
+            especialidades {
+                id
+                nombre
+            }
+        }
+    }
+""")
+
+GET_CITAS_PAGINADAS_QUERY = register_operation("""
+    query GetCitasPaginadas($limit: Int!, $offset: Int!) {
+        citas(limit: $limit, offset: $offset) {
+            id
+            usuario {
+                username
+            }
+            medico {
+                username
+            }
+            especialidad {
+                nombre
+            }
+            horario
+            fecha
+            nombreUsuarioLogeado
+        }
+    }
+""")
+
+GET_CITAS_POR_MEDICO_PAGINADAS_QUERY = register_operation("""
+    query GetCitasPorMedicoPaginadas($medicoId: ID!, $limit: Int!, $offset: Int!) {
+        citasPorMedico(medicoId: $medicoId, limit: $limit, offset: $offset) {
+            id
+            usuario {
+                username
+            }
+            medico {
+                username
+            }
+            especialidad {
+                nombre
+            }
+            horario
+            fecha
+            nombreUsuarioLogeado
+        }
+    }
+""")
+
+# Seconds that responses of slow-changing catalog operations stay in the
+# response cache. Operations not listed here always hit the backend.
+CACHE_TTLS = {
+    "GetEspecialidades": 3600,
+    "GetEspecialidad": 3600,
+    "GetMedicos": 600,
+    "GetMedicosPaginados": 600,
+    "GetUsuarios": 300,
+    "GetUsuariosPaginados": 300,
+}
+
+# Set to false if the backend's list fields do not take `limit` and `offset`.
+# Fields whose arguments the backend rejects are also detected one by one.
+SERVER_PAGINATION = os.getenv("GRAPHQL_SERVER_PAGINATION", "true").lower() == "true"
+# Rows per backend page when a whole list is read page by page, and pages
+# requested ahead of the one being read.
+PAGE_SIZE = int(os.getenv("GRAPHQL_PAGE_SIZE", "500"))
+PAGE_PREFETCH = int(os.getenv("GRAPHQL_PAGE_PREFETCH", "2"))
+
+# Reports with at least this many rows are always rendered in the background.
+REPORT_BACKGROUND_THRESHOLD = int(os.getenv("REPORT_BACKGROUND_THRESHOLD", "5000"))
+
+REPORT_GENERATORS = {
+    "pdf": generar_pdf,
+    "excel": generar_excel,
+    "csv": generar_csv,
+    "jsonl": generar_jsonl,
+    "parquet": generar_parquet,
+}
+REPORT_LABELS = {
+    "pdf": "PDF",
+    "excel": "Excel",
+    "csv": "CSV",
+    "jsonl": "JSONL",
+    "parquet": "Parquet",
+}
 
 
 def execute_graphql_query(query: str, variables: dict = None) -> dict:
@@ -25,15 +333,23 @@ def execute_graphql_query(query: str, variables: dict = None) -> dict:
     try:
         # For now, we are not handling authentication tokens.
         # We will add this capability later if needed.
-        client = GraphQLClient()
+        # All tools share one pooled client so connections are reused.
+        client = get_client()
 
         print(f"Executing GraphQL query:\n{query}")
         if variables:
             print(f"With variables: {variables}")
 
-        result = client.execute(query, variables)
+        # When batching is enabled, concurrent tool calls are merged into a
+        # single request to the backend.
+        cache_ttl = CACHE_TTLS.get(operation_name(query))
+        batcher = get_batcher()
+        if batcher is not None and not cache_ttl:
+            result = batcher.execute(query, variables)
+        else:
+            result = client.execute(query, variables, cache_ttl=cache_ttl)
 
-        print(f"GraphQL response: {result}")
+        print(f"GraphQL response: {_describe_result(result)}")
         return result
 
     except Exception as e:
@@ -41,69 +357,400 @@ def execute_graphql_query(query: str, variables: dict = None) -> dict:
         return {"error": str(e)}
 
 
-def generar_pdf_tool(datos: list[dict], nombre_archivo: str = None) -> str:
+def _describe_result(result):
     """
-    A tool that allows the agent to generate a PDF report from a list of dictionaries.
+    Summarizes a GraphQL response for the logs without rendering every row.
+    """
+    if not isinstance(result, dict):
+        return repr(result)[:200]
+    parts = []
+    for field, value in (result.get("data") or {}).items():
+        if isinstance(value, list):
+            parts.append(f"{field}: {len(value)} rows")
+        else:
+            parts.append(f"{field}: {repr(value)[:200]}")
+    if result.get("errors"):
+        parts.append(f"errors: {result['errors']}")
+    return ", ".join(parts) or repr(result)[:200]
+
+
+def _page_variables(variables, limit, page):
+    """
+    Returns the query variables for the 1-based page `page` of size `limit`.
+    """
+    return dict(variables or {}, limit=limit, offset=(max(page, 1) - 1) * limit)
+
+
+def _with_pagination(result, field, limit, page):
+    """
+    Annotates a paginated tool result so the model knows whether more pages exist.
+    """
+    rows = (result.get("data") or {}).get(field) if isinstance(result, dict) else None
+    if isinstance(rows, list):
+        result["pagination"] = {
+            "page": max(page, 1),
+            "limit": limit,
+            "has_more": len(rows) == limit,
+        }
+    return result
+
+
+# List fields whose `limit` and `offset` arguments the backend has rejected.
+_unpaginated_fields = set()
 
-    Args:
-        datos (list[dict]): A list of dictionaries with the data to include in the report.
-        nombre_archivo (str, optional): The name of the PDF file. If not provided, a default name will be generated.
+
+def _pagination_unsupported(messages):
+    """
+    Returns True if an error message says the backend does not know the
+    `limit`/`offset` arguments.
+    """
+    return any(
+        re.search(r"argument", message, re.I)
+        and re.search(r"\b(limit|offset)\b", message)
+        for message in messages
+    )
+
+
+def _result_messages(result):
+    messages = [error.get("message", "") for error in result.get("errors") or []]
+    return messages + [str(result.get("error") or "")]
+
+
+def _paginates(field):
+    return SERVER_PAGINATION and field not in _unpaginated_fields
+
+
+def _page(field, paged_query, variables, limit, page, campos):
+    """
+    Returns page `page` of `limit` rows of a list field, or an error telling
+    the model to ask for the whole list if the backend cannot paginate it.
+    """
+    if _paginates(field):
+        result = execute_graphql_query(
+            project_query(paged_query, campos), _page_variables(variables, limit, page)
+        )
+        if not _pagination_unsupported(_result_messages(result)):
+            return _with_pagination(result, field, limit, page)
+        print(f"The backend does not paginate '{field}'")
+        _unpaginated_fields.add(field)
+    return {
+        "error": f"The backend cannot return '{field}' page by page. Call the tool "
+        "again without limit and page; long results are summarized."
+    }
+
+
+def _all_rows(field, paged_query, full_query, variables, campos):
+    """
+    Returns every row of a list field. When the backend paginates the field,
+    the list is read page by page with the next pages requested while earlier
+    ones are decoded, so no single response carries the whole list. Otherwise
+    the rows are streamed out of one response, except for cached catalogs.
+    """
+    if _paginates(field):
+        query = project_query(paged_query, campos)
+        print(f"Paginating GraphQL list '{field}' ({PAGE_SIZE} rows per page)")
+        try:
+            rows = list(
+                get_client().paginate(
+                    query,
+                    field,
+                    variables,
+                    page_size=PAGE_SIZE,
+                    prefetch=PAGE_PREFETCH,
+                    cache_ttl=CACHE_TTLS.get(operation_name(query)),
+                )
+            )
+        except GraphQLClientError as e:
+            if not _pagination_unsupported([str(e)]):
+                raise
+            print(f"The backend does not paginate '{field}'; reading it whole")
+            _unpaginated_fields.add(field)
+        else:
+            return {"data": {field: rows}}
+
+    query = project_query(full_query, campos)
+    if CACHE_TTLS.get(operation_name(query)):
+        return execute_graphql_query(query, variables)
+    # The rows are decoded as the body arrives instead of buffering the whole
+    # response and decoding it at once.
+    print(f"Streaming GraphQL list '{field}'")
+    rows = list(get_client().execute_stream(query, field, variables))
+    return {"data": {field: rows}}
+
+
+def _report_rows(datos, datos_id, filtros, ordenar_por, columnas):
+    """
+    Resolves the rows of a report from inline data or a stored result handle,
+    applying the requested filters, sort order and columns.
+    """
+    if datos_id:
+        rows = result_store.get(datos_id)
+    elif datos is not None:
+        rows = [flatten_row(row) for row in datos]
+    else:
+        raise ValueError("Either datos or datos_id must be provided.")
+    return select_rows(rows, filtros, ordenar_por, columnas)
+
+
+def _write_report(formato, extension, datos, nombre_archivo, en_segundo_plano):
+    """
+    Writes a report in the calling thread, or queues it on the background
+    report workers when asked to or when it is large. Reports identical to a
+    previous one are served from the report cache without rendering.
 
     Returns:
-        str: The path to the generated PDF file.
+        dict: `{"type": "report", "format": ..., "path": ..., "rows": ...}`, or
+        `{"type": "job", "job_id": ..., "status": ..., "rows": ...}` if the
+        report was queued.
+
+    Raises:
+        ValueError: If there are no rows to write.
     """
+    if not datos:
+        # The generators write no file for empty data, which would leave a
+        # report or a finished job pointing at nothing.
+        raise ValueError(
+            "There are no rows to write: the data, after filters, is empty."
+        )
+    label = REPORT_LABELS[formato]
+    key = report_key(formato, datos)
+    if nombre_archivo:
+        # Reports live in the reports directory under a name no other report
+        # uses, so concurrent requests never overwrite each other's files.
+        nombre_archivo = report_storage.unique_path(nombre_archivo)
+
     try:
-        if nombre_archivo is None:
-            # Generate a default file name with timestamp
-            from datetime import datetime
+        cached = report_cache.get(key, extension)
+        if cached is not None:
+            nombre_archivo = report_cache.copy_to(cached, nombre_archivo)
+        elif en_segundo_plano or len(datos) >= REPORT_BACKGROUND_THRESHOLD:
+            job = report_jobs.submit(
+                formato, datos, nombre_archivo or report_cache.path(key, extension)
+            )
+            print(f"Report job queued: {job.id}")
+            return {
+                "type": "job",
+                "job_id": job.id,
+                "status": job.status,
+                "rows": len(datos),
+                "message": f"Report job queued: {job.id}",
+            }
+        else:
+            nombre_archivo = report_cache.render(
+                key, extension, REPORT_GENERATORS[formato], datos, nombre_archivo
+            )
+    except Exception:
+        if nombre_archivo:
+            report_storage.release(nombre_archivo)
+        raise
+    print(f"{label} report generated: {nombre_archivo}")
+    return {
+        "type": "report",
+        "format": formato,
+        "path": nombre_archivo,
+        "rows": len(datos),
+    }
+
+
+def generar_pdf_tool(
+    datos: list[dict] = None,
+    nombre_archivo: str = None,
+    datos_id: str = None,
+    filtros: list[str] = None,
+    ordenar_por: str = None,
+    columnas: list[str] = None,
+    en_segundo_plano: bool = False,
+) -> dict:
+    """
+    A tool that allows the agent to generate a PDF report from a list of dictionaries.
 
-            timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-            nombre_archivo = f"reports/reporte_{timestamp}.pdf"
+    Prefer `datos_id` over `datos` when a data tool result was truncated: pass
+    its `handle` and the report is built from the full result kept on the
+    server, without repeating the rows. Results returned in full have no
+    handle; pass their rows as `datos`.
 
-        # Create reports directory if it doesn't exist
-        import os
+    Args:
+        datos (list[dict], optional): A list of dictionaries with the data to include in the report.
+        nombre_archivo (str, optional): The name of the PDF file. If not provided, a default name will be generated.
+        datos_id (str, optional): The handle of a previous, truncated data tool result to use instead of `datos`.
+        filtros (list[str], optional): Conditions the rows must meet, e.g. ["fecha>=2025-01-01", "medico.username=drlopez"]. Operators: =, !=, >, <, >=, <=, ~ (contains).
+        ordenar_por (str, optional): Comma-separated columns to sort by; prefix a column with "-" for descending order.
+        columnas (list[str], optional): The columns to include, in order.
+        en_segundo_plano (bool, optional): Render the report as a background job and return its job ID right away. Large reports always run in the background.
 
-        os.makedirs("reports", exist_ok=True)
+    Returns:
+        dict: The format, path and row count of the generated PDF file, or
+        the job ID and status if it was queued for background rendering.
+    """
+    try:
+        datos = _report_rows(datos, datos_id, filtros, ordenar_por, columnas)
 
-        generar_pdf(datos, nombre_archivo)
-        print(f"PDF report generated: {nombre_archivo}")
-        return nombre_archivo
+        return _write_report("pdf", "pdf", datos, nombre_archivo, en_segundo_plano)
 
     except Exception as e:
         print(f"Error generating PDF report: {e}")
         return {"error": str(e)}
 
 
-def generar_excel_tool(datos: list[dict], nombre_archivo: str = None) -> str:
+def generar_excel_tool(
+    datos: list[dict] = None,
+    nombre_archivo: str = None,
+    datos_id: str = None,
+    filtros: list[str] = None,
+    ordenar_por: str = None,
+    columnas: list[str] = None,
+    en_segundo_plano: bool = False,
+) -> dict:
     """
     A tool that allows the agent to generate an Excel report from a list of dictionaries.
 
+    Prefer `datos_id` over `datos` when a data tool result was truncated: pass
+    its `handle` and the report is built from the full result kept on the
+    server, without repeating the rows. Results returned in full have no
+    handle; pass their rows as `datos`.
+
     Args:
-        datos (list[dict]): A list of dictionaries with the data to include in the report.
+        datos (list[dict], optional): A list of dictionaries with the data to include in the report.
         nombre_archivo (str, optional): The name of the Excel file. If not provided, a default name will be generated.
+        datos_id (str, optional): The handle of a previous, truncated data tool result to use instead of `datos`.
+        filtros (list[str], optional): Conditions the rows must meet, e.g. ["fecha>=2025-01-01", "medico.username=drlopez"]. Operators: =, !=, >, <, >=, <=, ~ (contains).
+        ordenar_por (str, optional): Comma-separated columns to sort by; prefix a column with "-" for descending order.
+        columnas (list[str], optional): The columns to include, in order.
+        en_segundo_plano (bool, optional): Render the report as a background job and return its job ID right away. Large reports always run in the background.
+
+    Returns:
+        dict: The format, path and row count of the generated Excel file, or
+        the job ID and status if it was queued for background rendering.
+    """
+    try:
+        datos = _report_rows(datos, datos_id, filtros, ordenar_por, columnas)
+
+        return _write_report("excel", "xlsx", datos, nombre_archivo, en_segundo_plano)
+
+    except Exception as e:
+        print(f"Error generating Excel report: {e}")
+        return {"error": str(e)}
+
+
+def generar_csv_tool(
+    datos: list[dict] = None,
+    nombre_archivo: str = None,
+    datos_id: str = None,
+    filtros: list[str] = None,
+    ordenar_por: str = None,
+    columnas: list[str] = None,
+    en_segundo_plano: bool = False,
+) -> dict:
+    """
+    A tool that allows the agent to export a list of dictionaries as a CSV file (comma-separated, UTF-8) for loading into other systems.
+
+    Prefer `datos_id` over `datos` when a data tool result was truncated: pass
+    its `handle` and the report is built from the full result kept on the
+    server, without repeating the rows. Results returned in full have no
+    handle; pass their rows as `datos`.
+
+    Args:
+        datos (list[dict], optional): A list of dictionaries with the data to include in the report.
+        nombre_archivo (str, optional): The name of the CSV file. If not provided, a default name will be generated.
+        datos_id (str, optional): The handle of a previous, truncated data tool result to use instead of `datos`.
+        filtros (list[str], optional): Conditions the rows must meet, e.g. ["fecha>=2025-01-01", "medico.username=drlopez"]. Operators: =, !=, >, <, >=, <=, ~ (contains).
+        ordenar_por (str, optional): Comma-separated columns to sort by; prefix a column with "-" for descending order.
+        columnas (list[str], optional): The columns to include, in order.
+        en_segundo_plano (bool, optional): Render the report as a background job and return its job ID right away. Large reports always run in the background.
 
     Returns:
-        str: The path to the generated Excel file.
+        dict: The format, path and row count of the generated CSV file, or
+        the job ID and status if it was queued for background rendering.
     """
     try:
-        if nombre_archivo is None:
-            # Generate a default file name with timestamp
-            from datetime import datetime
+        datos = _report_rows(datos, datos_id, filtros, ordenar_por, columnas)
+
+        return _write_report("csv", "csv", datos, nombre_archivo, en_segundo_plano)
+
+    except Exception as e:
+        print(f"Error generating CSV export: {e}")
+        return {"error": str(e)}
+
+
+def generar_jsonl_tool(
+    datos: list[dict] = None,
+    nombre_archivo: str = None,
+    datos_id: str = None,
+    filtros: list[str] = None,
+    ordenar_por: str = None,
+    columnas: list[str] = None,
+    en_segundo_plano: bool = False,
+) -> dict:
+    """
+    A tool that allows the agent to export a list of dictionaries as a JSON Lines file (one JSON object per line) for loading into other systems.
 
-            timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-            nombre_archivo = f"reports/reporte_{timestamp}.xlsx"
+    Prefer `datos_id` over `datos` when a data tool result was truncated: pass
+    its `handle` and the report is built from the full result kept on the
+    server, without repeating the rows. Results returned in full have no
+    handle; pass their rows as `datos`.
 
-        # Create reports directory if it doesn't exist
-        import os
+    Args:
+        datos (list[dict], optional): A list of dictionaries with the data to include in the report.
+        nombre_archivo (str, optional): The name of the JSONL file. If not provided, a default name will be generated.
+        datos_id (str, optional): The handle of a previous, truncated data tool result to use instead of `datos`.
+        filtros (list[str], optional): Conditions the rows must meet, e.g. ["fecha>=2025-01-01", "medico.username=drlopez"]. Operators: =, !=, >, <, >=, <=, ~ (contains).
+        ordenar_por (str, optional): Comma-separated columns to sort by; prefix a column with "-" for descending order.
+        columnas (list[str], optional): The columns to include, in order.
+        en_segundo_plano (bool, optional): Render the report as a background job and return its job ID right away. Large reports always run in the background.
 
-        os.makedirs("reports", exist_ok=True)
+    Returns:
+        dict: The format, path and row count of the generated JSONL file, or
+        the job ID and status if it was queued for background rendering.
+    """
+    try:
+        datos = _report_rows(datos, datos_id, filtros, ordenar_por, columnas)
 
-        generar_excel(datos, nombre_archivo)
-        print(f"Excel report generated: {nombre_archivo}")
-        return nombre_archivo
+        return _write_report("jsonl", "jsonl", datos, nombre_archivo, en_segundo_plano)
 
     except Exception as e:
-        print(f"Error generating Excel report: {e}")
+        print(f"Error generating JSONL export: {e}")
+        return {"error": str(e)}
+
+
+def generar_parquet_tool(
+    datos: list[dict] = None,
+    nombre_archivo: str = None,
+    datos_id: str = None,
+    filtros: list[str] = None,
+    ordenar_por: str = None,
+    columnas: list[str] = None,
+    en_segundo_plano: bool = False,
+) -> dict:
+    """
+    A tool that allows the agent to export a list of dictionaries as a columnar Parquet file for analytics tools.
+
+    Prefer `datos_id` over `datos` when a data tool result was truncated: pass
+    its `handle` and the report is built from the full result kept on the
+    server, without repeating the rows. Results returned in full have no
+    handle; pass their rows as `datos`.
+
+    Args:
+        datos (list[dict], optional): A list of dictionaries with the data to include in the report.
+        nombre_archivo (str, optional): The name of the Parquet file. If not provided, a default name will be generated.
+        datos_id (str, optional): The handle of a previous, truncated data tool result to use instead of `datos`.
+        filtros (list[str], optional): Conditions the rows must meet, e.g. ["fecha>=2025-01-01", "medico.username=drlopez"]. Operators: =, !=, >, <, >=, <=, ~ (contains).
+        ordenar_por (str, optional): Comma-separated columns to sort by; prefix a column with "-" for descending order.
+        columnas (list[str], optional): The columns to include, in order.
+        en_segundo_plano (bool, optional): Render the report as a background job and return its job ID right away. Large reports always run in the background.
+
+    Returns:
+        dict: The format, path and row count of the generated Parquet file, or
+        the job ID and status if it was queued for background rendering.
+    """
+    try:
+        datos = _report_rows(datos, datos_id, filtros, ordenar_por, columnas)
+
+        return _write_report(
+            "parquet", "parquet", datos, nombre_archivo, en_segundo_plano
+        )
+
+    except Exception as e:
+        print(f"Error generating Parquet export: {e}")
         return {"error": str(e)}
 
 
@@ -115,14 +762,7 @@ def get_especialidades() -> dict:
         dict: A list of specialties with their ID and name.
     """
     try:
-        query = """
-            query GetEspecialidades {
-                especialidades {
-                    id
-                    nombre
-                }
-            }
-        """
+        query = GET_ESPECIALIDADES_QUERY
         return execute_graphql_query(query)
     except Exception as e:
         print(f"Error getting specialties: {e}")
@@ -140,14 +780,7 @@ def get_especialidad_por_id(especialidad_id: str) -> dict:
         dict: The specialty information with ID and name.
     """
     try:
-        query = """
-            query GetEspecialidad($id: ID!) {
-                especialidad(id: $id) {
-                    id
-                    nombre
-                }
-            }
-        """
+        query = GET_ESPECIALIDAD_QUERY
         variables = {"id": especialidad_id}
         return execute_graphql_query(query, variables)
     except Exception as e:
@@ -155,86 +788,71 @@ def get_especialidad_por_id(especialidad_id: str) -> dict:
         return {"error": str(e)}
 
 
-def get_usuarios() -> dict:
+def get_usuarios(limit: int = None, page: int = 1, campos: list[str] = None) -> dict:
     """
     A tool that retrieves all users in the system with their basic information.
 
+    Args:
+        limit (int, optional): Maximum number of users to return. All of them are returned if omitted.
+        page (int, optional): The page to return (starting at 1) when `limit` is set.
+        campos (list[str], optional): Only return these fields, to keep the result small: "id", "username", "email", "roles.nombre". All fields are returned if omitted.
+
     Returns:
         dict: A list of users with ID, username, email, and roles.
     """
     try:
-        query = """
-            query GetUsuarios {
-                usuarios {
-                    id
-                    username
-                    email
-                    roles {
-                        id
-                        nombre
-                    }
-                }
-            }
-        """
-        return execute_graphql_query(query)
+        if limit:
+            return _page(
+                "usuarios", GET_USUARIOS_PAGINADOS_QUERY, None, limit, page, campos
+            )
+        return _all_rows(
+            "usuarios", GET_USUARIOS_PAGINADOS_QUERY, GET_USUARIOS_QUERY, None, campos
+        )
     except Exception as e:
         print(f"Error getting users: {e}")
         return {"error": str(e)}
 
 
-def get_medicos() -> dict:
+def get_medicos(limit: int = None, page: int = 1, campos: list[str] = None) -> dict:
     """
     A tool that retrieves all doctors/medicos in the system.
 
+    Args:
+        limit (int, optional): Maximum number of doctors to return. All of them are returned if omitted.
+        page (int, optional): The page to return (starting at 1) when `limit` is set.
+        campos (list[str], optional): Only return these fields, to keep the result small: "id", "username", "email", "especialidades.nombre". All fields are returned if omitted.
+
     Returns:
         dict: A list of doctors with their information and specialties.
     """
     try:
-        query = """
-            query GetMedicos {
-                medicos {
-                    id
-                    username
-                    email
-                    especialidades {
-                        id
-                        nombre
-                    }
-                }
-            }
-        """
-        return execute_graphql_query(query)
+        if limit:
+            return _page(
+                "medicos", GET_MEDICOS_PAGINADOS_QUERY, None, limit, page, campos
+            )
+        return _all_rows(
+            "medicos", GET_MEDICOS_PAGINADOS_QUERY, GET_MEDICOS_QUERY, None, campos
+        )
     except Exception as e:
         print(f"Error getting doctors: {e}")
         return {"error": str(e)}
 
 
-def get_usuarios_por_especialidad(especialidad_id: str) -> dict:
+def get_usuarios_por_especialidad(
+    especialidad_id: str, campos: list[str] = None
+) -> dict:
     """
     A tool that retrieves users (doctors) associated with a specific specialty.
 
     Args:
         especialidad_id (str): The ID of the specialty to filter by.
+        campos (list[str], optional): Only return these fields, to keep the result small: "usuarioId", "usuario", "especialidad", "turno", "horario", "dia", "fecha", "horarioId", "disponibilidad". All fields are returned if omitted.
 
     Returns:
         dict: A list of users with their specialty information.
     """
     try:
-        query = """
-            query GetUsuariosPorEspecialidad($especialidadId: ID!) {
-                usuariosPorEspecialidad(especialidadId: $especialidadId) {
-                    usuarioId
-                    usuario
-                    especialidad
-                    turno
-                    horario
-                    dia
-                    fecha
-                    horarioId
-                    disponibilidad
-                }
-            }
-        """
+        query = project_query(GET_USUARIOS_POR_ESPECIALIDAD_QUERY, campos)
         variables = {"especialidadId": especialidad_id}
         return execute_graphql_query(query, variables)
     except Exception as e:
@@ -242,69 +860,42 @@ def get_usuarios_por_especialidad(especialidad_id: str) -> dict:
         return {"error": str(e)}
 
 
-def get_citas() -> dict:
+def get_citas(limit: int = None, page: int = 1, campos: list[str] = None) -> dict:
     """
     A tool that retrieves all appointments in the system.
 
+    Args:
+        limit (int, optional): Maximum number of appointments to return. All of them are returned if omitted.
+        page (int, optional): The page to return (starting at 1) when `limit` is set.
+        campos (list[str], optional): Only return these fields, to keep the result small: "id", "fecha", "horario", "usuario.username", "medico.username", "especialidad.nombre", "nombreUsuarioLogeado". All fields are returned if omitted.
+
     Returns:
         dict: A list of appointments with patient, doctor, and schedule information.
     """
     try:
-        query = """
-            query GetCitas {
-                citas {
-                    id
-                    usuario {
-                        username
-                    }
-                    medico {
-                        username
-                    }
-                    especialidad {
-                        nombre
-                    }
-                    horario
-                    fecha
-                    nombreUsuarioLogeado
-                }
-            }
-        """
-        return execute_graphql_query(query)
+        if limit:
+            return _page("citas", GET_CITAS_PAGINADAS_QUERY, None, limit, page, campos)
+        return _all_rows(
+            "citas", GET_CITAS_PAGINADAS_QUERY, GET_CITAS_QUERY, None, campos
+        )
     except Exception as e:
         print(f"Error getting appointments: {e}")
         return {"error": str(e)}
 
 
-def get_citas_por_usuario(usuario_id: str) -> dict:
+def get_citas_por_usuario(usuario_id: str, campos: list[str] = None) -> dict:
     """
     A tool that retrieves all appointments for a specific user/patient.
 
     Args:
         usuario_id (str): The ID of the user/patient.
+        campos (list[str], optional): Only return these fields, to keep the result small: "id", "fecha", "horario", "usuario.username", "medico.username", "especialidad.nombre", "nombreUsuarioLogeado". All fields are returned if omitted.
 
     Returns:
         dict: A list of appointments for the specified user.
     """
     try:
-        query = """
-            query GetCitasPorUsuario($usuarioId: ID!) {
-                citasPorUsuario(usuarioId: $usuarioId) {
-                    id
-                    usuario {
-                        username
-                    }
-                    medico {
-                        username
-                    }
-                    especialidad {
-                        nombre
-                    }
-                    horario
-                    fecha
-                    nombreUsuarioLogeado
-                }
-            }
-        """
+        query = project_query(GET_CITAS_POR_USUARIO_QUERY, campos)
         variables = {"usuarioId": usuario_id}
         return execute_graphql_query(query, variables)
     except Exception as e:
@@ -312,67 +903,57 @@ def get_citas_por_usuario(usuario_id: str) -> dict:
         return {"error": str(e)}
 
 
-def get_citas_por_medico(medico_id: str) -> dict:
+def get_citas_por_medico(
+    medico_id: str, limit: int = None, page: int = 1, campos: list[str] = None
+) -> dict:
     """
     A tool that retrieves all appointments for a specific doctor.
 
     Args:
         medico_id (str): The ID of the doctor.
+        limit (int, optional): Maximum number of appointments to return. All of them are returned if omitted.
+        page (int, optional): The page to return (starting at 1) when `limit` is set.
+        campos (list[str], optional): Only return these fields, to keep the result small: "id", "fecha", "horario", "usuario.username", "medico.username", "especialidad.nombre", "nombreUsuarioLogeado". All fields are returned if omitted.
 
     Returns:
         dict: A list of appointments for the specified doctor.
     """
     try:
-        query = """
-            query GetCitasPorMedico($medicoId: ID!) {
-                citasPorMedico(medicoId: $medicoId) {
-                    id
-                    usuario {
-                        username
-                    }
-                    medico {
-                        username
-                    }
-                    especialidad {
-                        nombre
-                    }
-                    horario
-                    fecha
-                    nombreUsuarioLogeado
-                }
-            }
-        """
         variables = {"medicoId": medico_id}
-        return execute_graphql_query(query, variables)
+        if limit:
+            return _page(
+                "citasPorMedico",
+                GET_CITAS_POR_MEDICO_PAGINADAS_QUERY,
+                variables,
+                limit,
+                page,
+                campos,
+            )
+        return _all_rows(
+            "citasPorMedico",
+            GET_CITAS_POR_MEDICO_PAGINADAS_QUERY,
+            GET_CITAS_POR_MEDICO_QUERY,
+            variables,
+            campos,
+        )
     except Exception as e:
         print(f"Error getting appointments by doctor: {e}")
         return {"error": str(e)}
 
 
-def get_diagnosticos_por_paciente(paciente_id: str) -> dict:
+def get_diagnosticos_por_paciente(paciente_id: str, campos: list[str] = None) -> dict:
     """
     A tool that retrieves all diagnoses for a specific patient.
 
     Args:
         paciente_id (str): The ID of the patient.
+        campos (list[str], optional): Only return these fields, to keep the result small: "id", "descripcion", "tratamiento", "fecha", "nombreMedico", "nombrePaciente", "especialidad". All fields are returned if omitted.
 
     Returns:
         dict: A list of diagnoses for the specified patient.
     """
     try:
-        query = """
-            query GetDiagnosticosPorPaciente($pacienteId: ID!) {
-                diagnosticosPorPaciente(pacienteId: $pacienteId) {
-                    id
-                    descripcion
-                    tratamiento
-                    fecha
-                    nombreMedico
-                    nombrePaciente
-                    especialidad
-                }
-            }
-        """
+        query = project_query(GET_DIAGNOSTICOS_POR_PACIENTE_QUERY, campos)
         variables = {"pacienteId": paciente_id}
         return execute_graphql_query(query, variables)
     except Exception as e:
@@ -380,40 +961,19 @@ def get_diagnosticos_por_paciente(paciente_id: str) -> dict:
         return {"error": str(e)}
 
 
-def get_triajes_por_paciente(paciente_id: str) -> dict:
+def get_triajes_por_paciente(paciente_id: str, campos: list[str] = None) -> dict:
     """
     A tool that retrieves all triage records for a specific patient.
 
     Args:
         paciente_id (str): The ID of the patient.
+        campos (list[str], optional): Only return these fields, to keep the result small: "id", "fecha", "paciente.username", "enfermera.username", "temperatura", "peso", "estatura", "frecuenciaCardiaca", "frecuenciaRespiratoria", "saturacionOxigeno", "alergias", "enfermedadesCronicas", "motivoConsulta". All fields are returned if omitted.
 
     Returns:
         dict: A list of triage records for the specified patient.
     """
     try:
-        query = """
-            query GetTriajesPorPaciente($pacienteId: ID!) {
-                triajesPorPaciente(pacienteId: $pacienteId) {
-                    id
-                    paciente {
-                        username
-                    }
-                    enfermera {
-                        username
-                    }
-                    temperatura
-                    peso
-                    estatura
-                    frecuenciaCardiaca
-                    frecuenciaRespiratoria
-                    saturacionOxigeno
-                    alergias
-                    enfermedadesCronicas
-                    motivoConsulta
-                    fecha
-                }
-            }
-        """
+        query = project_query(GET_TRIAJES_POR_PACIENTE_QUERY, campos)
         variables = {"pacienteId": paciente_id}
         return execute_graphql_query(query, variables)
     except Exception as e:
@@ -421,38 +981,58 @@ def get_triajes_por_paciente(paciente_id: str) -> dict:
         return {"error": str(e)}
 
 
-def get_horarios_disponibles(especialidad_id: str, fecha: str) -> dict:
+def get_resumen_paciente(paciente_id: str) -> dict:
+    """
+    A tool that retrieves the appointments, diagnoses and triage records of a
+    patient in a single request. Prefer it over calling `get_citas_por_usuario`,
+    `get_diagnosticos_por_paciente` and `get_triajes_por_paciente` one by one.
+
+    Args:
+        paciente_id (str): The ID of the patient.
+
+    Returns:
+        dict: The patient's appointments, diagnoses and triage records.
+    """
+    try:
+        queries = [
+            (GET_CITAS_POR_USUARIO_QUERY, {"usuarioId": paciente_id}),
+            (GET_DIAGNOSTICOS_POR_PACIENTE_QUERY, {"pacienteId": paciente_id}),
+            (GET_TRIAJES_POR_PACIENTE_QUERY, {"pacienteId": paciente_id}),
+        ]
+        print(f"Executing batched patient summary for: {paciente_id}")
+        results = get_client().execute_many(queries)
+
+        resumen = {"data": {}}
+        errors = []
+        for result in results:
+            resumen["data"].update(result.get("data") or {})
+            errors.extend(result.get("errors") or [])
+        if errors:
+            resumen["errors"] = errors
+
+        print(f"GraphQL response: {_describe_result(resumen)}")
+        return resumen
+    except Exception as e:
+        print(f"Error getting patient summary: {e}")
+        return {"error": str(e)}
+
+
+def get_horarios_disponibles(
+    especialidad_id: str, fecha: str, campos: list[str] = None
+) -> dict:
     """
     A tool that retrieves available schedules for a specific specialty and date.
 
     Args:
         especialidad_id (str): The ID of the specialty.
         fecha (str): The date in YYYY-MM-DD format.
+        campos (list[str], optional): Only return these fields, to keep the result small: "id", "fecha", "horaInicio", "horaFin", "disponible", "especialidad.nombre", "turno.nombre", "dia.nombre". All fields are returned if omitted.
 
     Returns:
         dict: A list of available schedules for the specified specialty and date.
     """
     try:
-        query = """
-            query GetHorariosDisponibles($especialidadId: ID!, $fecha: Date!) {
-                horariosDisponibles(especialidadId: $especialidadId, fecha: $fecha) {
-                    id
-                    fecha
-                    horaInicio
-                    horaFin
-                    disponible
-                    especialidad {
-                        nombre
-                    }
-                    turno {
-                        nombre
-                    }
-                    dia {
-                        nombre
-                    }
-                }
-            }
-        """
+        query = project_query(GET_HORARIOS_DISPONIBLES_QUERY, campos)
         variables = {"especialidadId": especialidad_id, "fecha": fecha}
         return execute_graphql_query(query, variables)
     except Exception as e:
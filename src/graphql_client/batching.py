@@ -0,0 +1,201 @@
+import contextlib
+import contextvars
+import re
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from src.graphql_client.documents import root_fields, split_operation
+from src.graphql_client.errors import DeadlineExceededError
+from src.graphql_client.resilience import current_deadline, deadline, remaining_time
+
+_VARIABLE_RE = re.compile(r"\$(\w+)")
+
+
+def merge_queries(requests):
+    """
+    Merges several query operations into one aliased multi-root document.
+
+    Every root field is aliased and every variable is renamed with a
+    per-request prefix (`b0_`, `b1_`, ...) so documents that use the same
+    field or variable names do not collide.
+
+    Args:
+        requests (list[tuple[str, dict]]): `(query, variables)` pairs.
+
+    Returns:
+        tuple: The merged document, the merged variables, and for every
+        request a mapping of merged alias to its original response key.
+
+    Raises:
+        ValueError: If a document is not a plain query operation.
+    """
+    definitions = []
+    selections = []
+    merged_variables = {}
+    aliases = []
+
+    for index, (query, variables) in enumerate(requests):
+        prefix = f"b{index}_"
+
+        def rename(match, prefix=prefix):
+            return f"${prefix}{match.group(1)}"
+
+        request_definitions, body = split_operation(query)
+        if request_definitions:
+            definitions.append(_VARIABLE_RE.sub(rename, request_definitions))
+        for name, value in (variables or {}).items():
+            merged_variables[prefix + name] = value
+
+        request_aliases = {}
+        for key, field in root_fields(_VARIABLE_RE.sub(rename, body)):
+            field_start = field
+            if re.match(r"\w+\s*:", field):
+                field_start = field.split(":", 1)[1].lstrip()
+            alias = prefix + key
+            request_aliases[alias] = key
+            selections.append(f"{alias}: {field_start}")
+        aliases.append(request_aliases)
+
+    header = "query Batch"
+    if definitions:
+        header += "(" + ", ".join(definitions) + ")"
+    document = header + " {\n" + "\n".join(selections) + "\n}"
+    return document, merged_variables, aliases
+
+
+def split_batch_result(result, aliases):
+    """
+    Splits the response of a merged document back into one response per request.
+
+    Args:
+        result (dict): The JSON response of the merged document.
+        aliases (list[dict]): The alias mappings returned by `merge_queries`.
+
+    Returns:
+        list[dict]: One `{"data": ..., "errors": ...}` response per request.
+    """
+    data = result.get("data") or {}
+    errors = result.get("errors") or []
+    responses = []
+    for request_aliases in aliases:
+        response = {
+            "data": {key: data.get(alias) for alias, key in request_aliases.items()}
+        }
+        request_errors = []
+        for error in errors:
+            path = error.get("path") or []
+            if path and path[0] in request_aliases:
+                error = dict(error)
+                error["path"] = [request_aliases[path[0]]] + list(path[1:])
+                request_errors.append(error)
+            elif not path:
+                # Document-level errors affect every request in the batch.
+                request_errors.append(error)
+        if request_errors:
+            response["errors"] = request_errors
+        responses.append(response)
+    return responses
+
+
+def has_document_errors(result):
+    """
+    Returns True if a merged response has errors that no single request can
+    be blamed for (no path), such as a validation error in one of the
+    merged queries.
+    """
+    return any(not error.get("path") for error in result.get("errors") or [])
+
+
+class QueryBatcher:
+    """
+    Collects queries issued by concurrent callers within a short window and
+    sends them to the backend as a single merged document.
+    """
+
+    def __init__(self, client, window=0.005, max_batch_size=10):
+        self.client = client
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._pending = []
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def submit(self, query, variables=None):
+        """
+        Queues a query for the next batch.
+
+        Returns:
+            Future: Resolves to the query's own JSON response.
+        """
+        future = Future()
+        batch = None
+        with self._lock:
+            self._pending.append((query, variables, future, current_deadline()))
+            if len(self._pending) >= self.max_batch_size:
+                batch = self._take_pending()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.window, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if batch:
+            self._dispatch(batch)
+        return future
+
+    def execute(self, query, variables=None):
+        """
+        Queues a query and blocks until its batch has been answered, or until
+        the caller's deadline runs out.
+
+        Raises:
+            DeadlineExceededError: If the deadline passes first.
+        """
+        future = self.submit(query, variables)
+        try:
+            return future.result(timeout=remaining_time())
+        except FutureTimeoutError:
+            raise DeadlineExceededError(
+                "Failed to execute GraphQL query: request deadline exceeded."
+            ) from None
+
+    def flush(self):
+        """
+        Sends every queued query immediately.
+        """
+        with self._lock:
+            batch = self._take_pending()
+        if batch:
+            self._dispatch(batch)
+
+    def _take_pending(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        return batch
+
+    def _dispatch(self, batch):
+        # Batches are sent from the timer thread or from whichever caller
+        # filled them, so they run in a fresh context under the longest
+        # deadline of their requests: no caller's budget cuts another's short,
+        # and each caller stops waiting at its own deadline in `execute`.
+        deadlines = [expires_at for _, _, _, expires_at in batch]
+        if None in deadlines:
+            budget = contextlib.nullcontext()
+        else:
+            budget = deadline(max(deadlines) - time.monotonic())
+        contextvars.Context().run(self._send_batch, batch, budget)
+
+    def _send_batch(self, batch, budget):
+        try:
+            with budget:
+                results = self.client.execute_many(
+                    [(query, variables) for query, variables, _, _ in batch]
+                )
+        except Exception as e:
+            for _, _, future, _ in batch:
+                future.set_exception(e)
+            return
+        for (_, _, future, _), result in zip(batch, results):
+            future.set_result(result)
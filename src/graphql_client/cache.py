@@ -0,0 +1,136 @@
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+
+_OPERATION_NAME_RE = re.compile(r"^\s*(?:query|mutation|subscription)\s+(\w+)")
+_MUTATION_RE = re.compile(r"^\s*mutation\b")
+
+
+def normalize_query(query):
+    """
+    Collapses whitespace so formatting differences do not produce different keys.
+    """
+    return " ".join(query.split())
+
+
+def operation_name(query):
+    """
+    Returns the operation name of a GraphQL document, or None if it is anonymous.
+    """
+    match = _OPERATION_NAME_RE.match(query)
+    return match.group(1) if match else None
+
+
+def is_mutation(query):
+    """
+    Returns True if the GraphQL document is a mutation operation.
+    """
+    return bool(_MUTATION_RE.match(query))
+
+
+def cache_key(query, variables=None):
+    """
+    Builds the cache key for a query from its normalized text and variables.
+    """
+    return normalize_query(query) + "|" + json.dumps(variables or {}, sort_keys=True)
+
+
+class ResponseCache:
+    """
+    In-memory TTL cache with LRU eviction bounded by entry count and bytes.
+
+    Values are stored serialized, which gives an exact size for the byte
+    budget and hands every caller its own copy of the response.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=8 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """
+        Returns the cached response for `key`, or None if it is missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            payload, expires_at, _, _ = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return json.loads(payload)
+
+    def set(self, key, value, ttl, operation=None):
+        """
+        Stores a response for `ttl` seconds, evicting least recently used
+        entries until the cache fits its limits again.
+        """
+        payload = json.dumps(value)
+        size = len(payload.encode("utf-8"))
+        if ttl <= 0 or size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (payload, time.monotonic() + ttl, operation, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, operation=None):
+        """
+        Drops cached responses.
+
+        Args:
+            operation (str, optional): Only drop responses of this operation
+                name (e.g. "GetEspecialidades"). Drops everything if omitted.
+
+        Returns:
+            int: The number of entries removed.
+        """
+        with self._lock:
+            if operation is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                self._bytes = 0
+                return removed
+            keys = [
+                key
+                for key, (_, _, entry_operation, _) in self._entries.items()
+                if entry_operation == operation
+            ]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def stats(self):
+        """
+        Returns hit/miss counters and the current size of the cache.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    def _remove(self, key):
+        _, _, _, size = self._entries.pop(key)
+        self._bytes -= size
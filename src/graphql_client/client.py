@@ -1,44 +1,462 @@
 import requests
 import os
+import threading
+import time
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
+from src.graphql_client.batching import (
+    QueryBatcher,
+    has_document_errors,
+    merge_queries,
+    split_batch_result,
+)
+from src.graphql_client.cache import (
+    ResponseCache,
+    cache_key,
+    is_mutation,
+    operation_name,
+)
+from src.graphql_client.errors import (
+    GraphQLClientError,
+    GraphQLConnectionError,
+    GraphQLHTTPError,
+    GraphQLTimeoutError,
+)
+from src.graphql_client.operations import (
+    persisted_query_not_found,
+    persisted_query_not_supported,
+    registry,
+)
+from src.graphql_client.pagination import paginate_cursor, paginate_offset
+from src.graphql_client.resilience import CircuitBreaker, RetryPolicy, call_timeout
+from src.graphql_client.singleflight import SingleFlight
+from src.graphql_client.streaming import iter_json_array
 
 load_dotenv()
 
 
+def _env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _env_float(name, default):
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def _env_bool(name, default):
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Connection pool defaults. They can be overridden through environment variables
+# so every worker process shares the same tuning without code changes.
+DEFAULT_POOL_CONNECTIONS = _env_int("GRAPHQL_POOL_CONNECTIONS", 4)
+DEFAULT_POOL_MAXSIZE = _env_int("GRAPHQL_POOL_MAXSIZE", 20)
+DEFAULT_CONNECT_TIMEOUT = _env_float("GRAPHQL_CONNECT_TIMEOUT", 3.05)
+DEFAULT_READ_TIMEOUT = _env_float("GRAPHQL_READ_TIMEOUT", 30.0)
+DEFAULT_KEEP_ALIVE = _env_bool("GRAPHQL_KEEP_ALIVE", True)
+
+# Send registered operations as automatic persisted queries (hash only),
+# falling back to the full document when the server does not know the hash.
+DEFAULT_PERSISTED_QUERIES = _env_bool("GRAPHQL_PERSISTED_QUERIES", True)
+
+# Batching window in milliseconds. Queries issued by concurrent tool calls
+# within this window share one request. 0 disables the batcher.
+DEFAULT_BATCH_WINDOW_MS = _env_float("GRAPHQL_BATCH_WINDOW_MS", 0)
+DEFAULT_BATCH_MAX_SIZE = _env_int("GRAPHQL_BATCH_MAX_SIZE", 10)
+
+# Bounds of the response cache shared by every client.
+DEFAULT_CACHE_MAX_ENTRIES = _env_int("GRAPHQL_CACHE_MAX_ENTRIES", 256)
+DEFAULT_CACHE_MAX_BYTES = _env_int("GRAPHQL_CACHE_MAX_BYTES", 8 * 1024 * 1024)
+
+response_cache = ResponseCache(
+    max_entries=DEFAULT_CACHE_MAX_ENTRIES, max_bytes=DEFAULT_CACHE_MAX_BYTES
+)
+
+# Retries apply only to idempotent queries, never to mutations.
+DEFAULT_MAX_RETRIES = _env_int("GRAPHQL_MAX_RETRIES", 2)
+DEFAULT_RETRY_BASE_DELAY = _env_float("GRAPHQL_RETRY_BASE_DELAY", 0.2)
+DEFAULT_RETRY_MAX_DELAY = _env_float("GRAPHQL_RETRY_MAX_DELAY", 2.0)
+
+# The breaker is shared by every client: they all talk to the same backend, so
+# they should agree on whether it is healthy.
+DEFAULT_BREAKER_THRESHOLD = _env_int("GRAPHQL_BREAKER_THRESHOLD", 5)
+DEFAULT_BREAKER_RESET_TIMEOUT = _env_float("GRAPHQL_BREAKER_RESET_TIMEOUT", 30.0)
+
+retry_policy = RetryPolicy(
+    max_attempts=DEFAULT_MAX_RETRIES + 1,
+    base_delay=DEFAULT_RETRY_BASE_DELAY,
+    max_delay=DEFAULT_RETRY_MAX_DELAY,
+)
+circuit_breaker = CircuitBreaker(
+    failure_threshold=DEFAULT_BREAKER_THRESHOLD,
+    reset_timeout=DEFAULT_BREAKER_RESET_TIMEOUT,
+)
+
+
+def _requests_error(e):
+    message = f"Failed to execute GraphQL query: {e}"
+    if isinstance(e, requests.exceptions.Timeout):
+        return GraphQLTimeoutError(message)
+    if isinstance(e, requests.exceptions.ConnectionError):
+        return GraphQLConnectionError(message)
+    if isinstance(e, requests.exceptions.HTTPError) and e.response is not None:
+        return GraphQLHTTPError(message, e.response.status_code)
+    return GraphQLClientError(message)
+
+
+def _retry_delay(client, error, attempt, attempts):
+    """
+    Feeds a failure to the client's circuit breaker and returns the backoff
+    delay before the next attempt, or None if the error must be raised.
+    """
+    if not error.retryable:
+        # The backend answered; it is reachable even if it refused the call.
+        client.circuit_breaker.record_success()
+        return None
+    client.circuit_breaker.record_failure()
+    if attempt >= attempts:
+        return None
+    return client.retry_policy.delay_within_deadline(attempt)
+
+
 class GraphQLClient:
-    def __init__(self, endpoint=None, token=None):
+    def __init__(
+        self,
+        endpoint=None,
+        token=None,
+        pool_connections=None,
+        pool_maxsize=None,
+        connect_timeout=None,
+        read_timeout=None,
+        keep_alive=None,
+        cache=None,
+        persisted_queries=None,
+        retry=None,
+        breaker=None,
+    ):
         self.endpoint = endpoint or os.getenv("GRAPHQL_ENDPOINT")
         self.token = token
         if not self.endpoint:
             raise ValueError(
                 "GraphQL endpoint not provided. Please set the GRAPHQL_ENDPOINT environment variable."
             )
+        self.cache = cache or response_cache
+        self.inflight = SingleFlight()
+        self.persisted_queries = (
+            DEFAULT_PERSISTED_QUERIES
+            if persisted_queries is None
+            else persisted_queries
+        )
+        self.retry_policy = retry or retry_policy
+        self.circuit_breaker = breaker or circuit_breaker
+
+        self.connect_timeout = (
+            connect_timeout if connect_timeout is not None else DEFAULT_CONNECT_TIMEOUT
+        )
+        self.read_timeout = (
+            read_timeout if read_timeout is not None else DEFAULT_READ_TIMEOUT
+        )
+        self.keep_alive = DEFAULT_KEEP_ALIVE if keep_alive is None else keep_alive
+
+        # A single session keeps TCP/TLS connections open between calls, so
+        # consecutive queries reuse the same socket instead of handshaking again.
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections or DEFAULT_POOL_CONNECTIONS,
+            pool_maxsize=pool_maxsize or DEFAULT_POOL_MAXSIZE,
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if not self.keep_alive:
+            self.session.headers["Connection"] = "close"
 
-    def execute(self, query, variables=None):
+    def execute(self, query, variables=None, cache_ttl=None):
         """
         Executes a GraphQL query.
 
         Args:
             query (str): The GraphQL query string.
             variables (dict, optional): A dictionary of variables for the query.
+            cache_ttl (float, optional): Seconds to keep a successful response
+                in the response cache. Responses are not cached if omitted.
 
         Returns:
             dict: The JSON response from the server.
 
         Raises:
-            Exception: If the query fails.
+            GraphQLClientError: If the query fails. Subclasses tell timeouts,
+                connection failures, HTTP errors, an exhausted deadline and an
+                open circuit apart.
+        """
+        if is_mutation(query):
+            return self._send(query, variables)
+
+        key = cache_key(query, variables)
+        if cache_ttl:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        def fetch():
+            result = self._send(query, variables)
+            if cache_ttl and "errors" not in result:
+                self.cache.set(key, result, cache_ttl, operation_name(query))
+            return result
+
+        # Identical queries already in flight share one upstream request.
+        return self.inflight.do(key, fetch)
+
+    def execute_stream(self, query, field, variables=None, chunk_size=64 * 1024):
+        """
+        Executes a GraphQL query and yields the rows of one list field as the
+        response body arrives, instead of decoding the whole document.
+
+        Streamed queries bypass the cache, coalescing and retries: rows are
+        handed to the caller as they are read, so a failed stream cannot be
+        replayed transparently.
+
+        Args:
+            query (str): The GraphQL query string.
+            field (str): The list field to stream, e.g. "citas".
+            variables (dict, optional): A dictionary of variables for the query.
+            chunk_size (int, optional): Bytes read from the socket at a time.
+
+        Yields:
+            dict: One row of the list at a time.
+
+        Raises:
+            GraphQLClientError: If the query fails.
         """
         headers = {}
         if self.token:
             headers["Authorization"] = f"Bearer {self.token}"
 
+        timeout = call_timeout(self.read_timeout)
+        self.circuit_breaker.before_call()
         try:
-            response = requests.post(
+            with self.session.post(
                 self.endpoint,
                 json={"query": query, "variables": variables},
                 headers=headers,
-            )
-            response.raise_for_status()  # Raise an exception for bad status codes
-            return response.json()
+                timeout=(min(self.connect_timeout, timeout), timeout),
+                stream=True,
+            ) as response:
+                response.raise_for_status()  # Raise an exception for bad status codes
+                self.circuit_breaker.record_success()
+                yield from iter_json_array(
+                    response.iter_content(chunk_size=chunk_size), field
+                )
         except requests.exceptions.RequestException as e:
-            raise Exception(f"Failed to execute GraphQL query: {e}")
+            error = _requests_error(e)
+            _retry_delay(self, error, attempt=1, attempts=1)
+            raise error from e
+        except BaseException:
+            self.circuit_breaker.release()
+            raise
+
+    def paginate(
+        self,
+        query,
+        field,
+        variables=None,
+        page_size=100,
+        mode="offset",
+        prefetch=2,
+        cache_ttl=None,
+    ):
+        """
+        Iterates over every row of a paginated list field.
+
+        Args:
+            query (str): The GraphQL query string. In "offset" mode it must
+                accept `$limit` and `$offset`; in "cursor" mode `$first` and
+                `$after` and return a Relay-style connection.
+            field (str): The paginated field, e.g. "citas".
+            variables (dict, optional): Additional variables for the query.
+            page_size (int, optional): Rows requested per page.
+            mode (str, optional): "offset" or "cursor".
+            prefetch (int, optional): Pages requested concurrently ahead of the
+                one being consumed (offset mode only).
+            cache_ttl (float, optional): Seconds to keep each page in the
+                response cache, as in `execute`.
+
+        Yields:
+            dict: One row at a time.
+
+        Raises:
+            GraphQLClientError: If a page fails.
+        """
+        if mode == "cursor":
+            return paginate_cursor(
+                self, query, field, variables, page_size, cache_ttl=cache_ttl
+            )
+        if mode == "offset":
+            return paginate_offset(
+                self, query, field, variables, page_size, prefetch, cache_ttl=cache_ttl
+            )
+        raise ValueError(f"Unknown pagination mode: {mode}")
+
+    def execute_many(self, queries):
+        """
+        Executes several queries in a single round trip.
+
+        The queries are merged into one aliased multi-root document and the
+        response is split back so every query gets its own result. Documents
+        that cannot be merged (mutations, fragments), and batches the server
+        rejects as a whole, are sent one by one.
+
+        Args:
+            queries (list[tuple[str, dict]]): `(query, variables)` pairs.
+
+        Returns:
+            list[dict]: The JSON response of each query, in the same order.
+
+        Raises:
+            GraphQLClientError: If the query fails. Subclasses tell timeouts,
+                connection failures, HTTP errors, an exhausted deadline and an
+                open circuit apart.
+        """
+        if len(queries) == 1:
+            query, variables = queries[0]
+            return [self.execute(query, variables)]
+        try:
+            document, variables, aliases = merge_queries(queries)
+        except ValueError:
+            return [self.execute(query, variables) for query, variables in queries]
+        result = self._post({"query": document, "variables": variables})
+        if has_document_errors(result):
+            # One invalid query fails validation of the whole merged document;
+            # sent on their own, the others still get their answers.
+            return [self.execute(query, variables) for query, variables in queries]
+        return split_batch_result(result, aliases)
+
+    def _send(self, query, variables):
+        idempotent = not is_mutation(query)
+        operation = registry.lookup(query) if self.persisted_queries else None
+        if operation is None:
+            return self._post({"query": query, "variables": variables}, idempotent)
+
+        try:
+            result = self._post(operation.persisted_payload(variables), idempotent)
+        except GraphQLHTTPError as e:
+            if e.retryable:
+                # The backend is failing, not refusing the request shape; the
+                # retries already spent on it must not be repeated.
+                raise
+            # Some servers reject unknown request shapes with a client error,
+            # which means they do not support persisted queries.
+            self.persisted_queries = False
+        else:
+            if persisted_query_not_supported(result):
+                # The server does not support persisted queries; stop paying
+                # for the extra round trip.
+                self.persisted_queries = False
+            elif not persisted_query_not_found(result):
+                # The server ran the query; its errors, if any, are the answer.
+                return result
+        return self._post(
+            operation.persisted_payload(variables, include_document=True), idempotent
+        )
+
+    def _post(self, payload, idempotent=True):
+        headers = {}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+
+        attempts = self.retry_policy.max_attempts if idempotent else 1
+        for attempt in range(1, attempts + 1):
+            # Check the deadline first: a call that cannot be made must not
+            # take the breaker's trial slot.
+            timeout = call_timeout(self.read_timeout)
+            self.circuit_breaker.before_call()
+            try:
+                response = self.session.post(
+                    self.endpoint,
+                    json=payload,
+                    headers=headers,
+                    timeout=(min(self.connect_timeout, timeout), timeout),
+                )
+                response.raise_for_status()  # Raise an exception for bad status codes
+                result = response.json()
+            except requests.exceptions.RequestException as e:
+                error = _requests_error(e)
+                delay = _retry_delay(self, error, attempt, attempts)
+                if delay is None:
+                    raise error from e
+                time.sleep(delay)
+            except BaseException:
+                # Neither a success nor a backend failure.
+                self.circuit_breaker.release()
+                raise
+            else:
+                self.circuit_breaker.record_success()
+                return result
+
+    def close(self):
+        """
+        Closes the pooled connections held by this client.
+        """
+        self.session.close()
+
+
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Returns the process-wide GraphQL client.
+
+    The client is created lazily on first use and then shared by every caller,
+    so all tools draw from the same keep-alive connection pool.
+
+    Returns:
+        GraphQLClient: The shared client instance.
+    """
+    global _shared_client
+    if _shared_client is None:
+        with _shared_client_lock:
+            if _shared_client is None:
+                _shared_client = GraphQLClient()
+    return _shared_client
+
+
+_shared_batcher = None
+
+
+def get_batcher():
+    """
+    Returns the process-wide query batcher, or None if batching is disabled.
+
+    Returns:
+        QueryBatcher: The shared batcher bound to the shared client.
+    """
+    global _shared_batcher
+    if DEFAULT_BATCH_WINDOW_MS <= 0:
+        return None
+    if _shared_batcher is None:
+        with _shared_client_lock:
+            if _shared_batcher is None:
+                _shared_batcher = QueryBatcher(
+                    get_client(),
+                    window=DEFAULT_BATCH_WINDOW_MS / 1000,
+                    max_batch_size=DEFAULT_BATCH_MAX_SIZE,
+                )
+    return _shared_batcher
+
+
+def close_client():
+    """
+    Closes and discards the process-wide GraphQL client, if one was created.
+    """
+    global _shared_client, _shared_batcher
+    with _shared_client_lock:
+        _shared_batcher = None
+        if _shared_client is not None:
+            _shared_client.close()
+            _shared_client = None
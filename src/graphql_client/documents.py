@@ -0,0 +1,87 @@
+import re
+
+_NAME_RE = re.compile(r"[_A-Za-z][_0-9A-Za-z]*")
+
+
+def matching_brace(text, start, opening="{", closing="}"):
+    """
+    Returns the index of the bracket that closes the one at `start`.
+    String literals are skipped so braces inside arguments do not count.
+    """
+    depth = 0
+    i = start
+    while i < len(text):
+        char = text[i]
+        if char == '"':
+            i += 1
+            while i < len(text) and text[i] != '"':
+                i += 2 if text[i] == "\\" else 1
+        elif char == opening:
+            depth += 1
+        elif char == closing:
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    raise ValueError("Unbalanced GraphQL document.")
+
+
+def split_operation(query):
+    """
+    Splits a single-operation query document into its variable definitions
+    and the body of its root selection set.
+    """
+    text = query.strip()
+    if text.startswith("{"):
+        definitions = ""
+    elif text.startswith("query"):
+        if "fragment " in text:
+            raise ValueError("Documents with fragments cannot be merged.")
+        header_end = text.index("{")
+        header = text[:header_end]
+        definitions = ""
+        if "(" in header:
+            open_paren = header.index("(")
+            definitions = header[
+                open_paren + 1 : matching_brace(header, open_paren, "(", ")")
+            ]
+    else:
+        raise ValueError("Only query operations can be merged into a batch.")
+
+    body_start = text.index("{")
+    body_end = matching_brace(text, body_start)
+    return definitions.strip(), text[body_start + 1 : body_end]
+
+
+def root_fields(body):
+    """
+    Yields `(response_key, field_text)` for every root field of a selection set.
+    """
+    i = 0
+    while i < len(body):
+        match = _NAME_RE.match(body, i)
+        if not match:
+            i += 1
+            continue
+
+        start = i
+        name = match.group(0)
+        i = match.end()
+        rest = body[i:].lstrip()
+        if rest.startswith(":"):
+            # Aliased field: `alias: field`.
+            i = body.index(":", i) + 1
+            while body[i].isspace():
+                i += 1
+            i = _NAME_RE.match(body, i).end()
+
+        while i < len(body) and body[i].isspace():
+            i += 1
+        if i < len(body) and body[i] == "(":
+            i = matching_brace(body, i, "(", ")") + 1
+        while i < len(body) and body[i].isspace():
+            i += 1
+        if i < len(body) and body[i] == "{":
+            i = matching_brace(body, i) + 1
+
+        yield name, body[start:i]
@@ -0,0 +1,48 @@
+class GraphQLClientError(Exception):
+    """
+    Base class for failures talking to the GraphQL backend.
+
+    `retryable` tells whether repeating the same idempotent request may succeed.
+    """
+
+    retryable = False
+
+
+class GraphQLConnectionError(GraphQLClientError):
+    """
+    The backend could not be reached or dropped the connection.
+    """
+
+    retryable = True
+
+
+class GraphQLTimeoutError(GraphQLClientError):
+    """
+    The backend did not answer within the per-call timeout.
+    """
+
+    retryable = True
+
+
+class GraphQLHTTPError(GraphQLClientError):
+    """
+    The backend answered with a non-success HTTP status.
+    """
+
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retryable = status_code == 429 or status_code >= 500
+
+
+class DeadlineExceededError(GraphQLClientError):
+    """
+    The time budget of the current agent request has been used up.
+    """
+
+
+class CircuitOpenError(GraphQLClientError):
+    """
+    The circuit breaker is open because the backend is failing; the call was
+    rejected without contacting it.
+    """
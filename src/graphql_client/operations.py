@@ -0,0 +1,131 @@
+import hashlib
+import re
+import threading
+
+from src.graphql_client.cache import operation_name
+
+_PUNCTUATORS = "!$():=@[]{}|,"
+_SPACE_AROUND_PUNCTUATOR_RE = re.compile(r"\s*([" + re.escape(_PUNCTUATORS) + r"])\s*")
+
+
+def minify(document):
+    """
+    Strips insignificant whitespace and comments from a GraphQL document.
+    String literals are left untouched.
+    """
+    parts = re.split(r'("(?:[^"\\]|\\.)*")', document)
+    minified = []
+    for index, part in enumerate(parts):
+        if index % 2:
+            minified.append(part)
+            continue
+        part = re.sub(r"#[^\n]*", "", part)
+        part = " ".join(part.split())
+        minified.append(_SPACE_AROUND_PUNCTUATOR_RE.sub(r"\1", part))
+    return "".join(minified).strip()
+
+
+class Operation:
+    """
+    A named GraphQL operation with its minified document and persisted-query hash.
+    """
+
+    def __init__(self, name, document):
+        self.name = name
+        self.document = document
+        self.sha256 = hashlib.sha256(document.encode("utf-8")).hexdigest()
+
+    def persisted_payload(self, variables=None, include_document=False):
+        """
+        Builds an automatic persisted query (APQ) request body.
+
+        Args:
+            variables (dict, optional): A dictionary of variables for the query.
+            include_document (bool): Send the full document along with the hash,
+                which also registers it on servers that support APQ.
+        """
+        payload = {
+            "operationName": self.name,
+            "variables": variables,
+            "extensions": {"persistedQuery": {"version": 1, "sha256Hash": self.sha256}},
+        }
+        if include_document:
+            payload["query"] = self.document
+        return payload
+
+
+class OperationRegistry:
+    """
+    Registry of the named operations sent by the high-level tools.
+    """
+
+    def __init__(self):
+        self._by_name = {}
+        self._by_document = {}
+        self._lock = threading.Lock()
+
+    def register(self, document):
+        """
+        Minifies and registers a document under its operation name.
+
+        Returns:
+            str: The minified document, to be sent in place of the original.
+
+        Raises:
+            ValueError: If the document is anonymous or its name is taken by a
+                different document.
+        """
+        document = minify(document)
+        name = operation_name(document)
+        if not name:
+            raise ValueError("Only named operations can be registered.")
+        with self._lock:
+            existing = self._by_name.get(name)
+            if existing is not None and existing.document != document:
+                raise ValueError(f"Operation '{name}' is already registered.")
+            operation = Operation(name, document)
+            self._by_name[name] = operation
+            self._by_document[document] = operation
+        return document
+
+    def get(self, name):
+        """
+        Returns the operation registered under `name`, or None.
+        """
+        return self._by_name.get(name)
+
+    def lookup(self, document):
+        """
+        Returns the registered operation for an exact document, or None.
+        """
+        return self._by_document.get(document)
+
+
+def persisted_query_not_found(result):
+    """
+    Returns True if the server asked for the full document of a persisted query.
+    """
+    for error in result.get("errors") or []:
+        code = (error.get("extensions") or {}).get("code")
+        if code == "PERSISTED_QUERY_NOT_FOUND" or error.get("message") == (
+            "PersistedQueryNotFound"
+        ):
+            return True
+    return False
+
+
+def persisted_query_not_supported(result):
+    """
+    Returns True if the server said it does not support persisted queries.
+    """
+    for error in result.get("errors") or []:
+        code = (error.get("extensions") or {}).get("code")
+        if code == "PERSISTED_QUERY_NOT_SUPPORTED" or error.get("message") == (
+            "PersistedQueryNotSupported"
+        ):
+            return True
+    return False
+
+
+registry = OperationRegistry()
+register_operation = registry.register
@@ -0,0 +1,95 @@
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from src.graphql_client.errors import GraphQLClientError
+
+
+def _rows(result, field):
+    if result.get("errors"):
+        messages = "; ".join(error.get("message", "") for error in result["errors"])
+        raise GraphQLClientError(f"Failed to execute GraphQL query: {messages}")
+    return (result.get("data") or {}).get(field)
+
+
+def _submit(pool, fn, *args):
+    # Worker threads do not inherit context variables, so the request deadline
+    # is carried over explicitly.
+    return pool.submit(contextvars.copy_context().run, fn, *args)
+
+
+def paginate_offset(
+    client, query, field, variables=None, page_size=100, prefetch=2, cache_ttl=None
+):
+    """
+    Yields the rows of an offset-paginated list field page after page.
+
+    The query must accept `$limit` and `$offset` variables. Up to `prefetch`
+    pages are requested concurrently ahead of the page being consumed; the
+    first short page marks the end of the list.
+    """
+    variables = dict(variables or {})
+
+    def fetch(offset):
+        page_variables = dict(variables, limit=page_size, offset=offset)
+        result = client.execute(query, page_variables, cache_ttl=cache_ttl)
+        return _rows(result, field) or []
+
+    pool = ThreadPoolExecutor(max_workers=max(1, prefetch))
+    pending = deque()
+    next_offset = 0
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < max(1, prefetch):
+                pending.append(_submit(pool, fetch, next_offset))
+                next_offset += page_size
+            if not pending:
+                return
+            rows = pending.popleft().result()
+            if len(rows) < page_size:
+                exhausted = True
+                for future in pending:
+                    future.cancel()
+                pending.clear()
+            yield from rows
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def paginate_cursor(
+    client, query, field, variables=None, page_size=100, cache_ttl=None
+):
+    """
+    Yields the rows of a Relay-style connection (`edges { node }` or `nodes`
+    plus `pageInfo { hasNextPage endCursor }`) page after page.
+
+    The query must accept `$first` and `$after` variables. The next page is
+    requested as soon as its cursor is known, while the current page is
+    being consumed.
+    """
+    variables = dict(variables or {})
+
+    def fetch(cursor):
+        page_variables = dict(variables, first=page_size, after=cursor)
+        result = client.execute(query, page_variables, cache_ttl=cache_ttl)
+        connection = _rows(result, field) or {}
+        if "nodes" in connection:
+            rows = connection["nodes"] or []
+        else:
+            rows = [edge["node"] for edge in connection.get("edges") or []]
+        page_info = connection.get("pageInfo") or {}
+        next_cursor = (
+            page_info.get("endCursor") if page_info.get("hasNextPage") else None
+        )
+        return rows, next_cursor
+
+    pool = ThreadPoolExecutor(max_workers=1)
+    try:
+        future = _submit(pool, fetch, None)
+        while future is not None:
+            rows, next_cursor = future.result()
+            future = _submit(pool, fetch, next_cursor) if next_cursor else None
+            yield from rows
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,159 @@
+import contextvars
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from src.graphql_client.errors import CircuitOpenError, DeadlineExceededError
+
+# Absolute monotonic time by which the current agent request must finish.
+_deadline = contextvars.ContextVar("graphql_deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds):
+    """
+    Limits every GraphQL call made inside the block to a shared time budget.
+
+    Nested deadlines can only shorten the budget, never extend it.
+
+    Args:
+        seconds (float): The budget for the whole block.
+    """
+    expires_at = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        expires_at = min(expires_at, current)
+    token = _deadline.set(expires_at)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time():
+    """
+    Returns the seconds left in the current deadline, or None if there is none.
+    """
+    expires_at = _deadline.get()
+    if expires_at is None:
+        return None
+    return expires_at - time.monotonic()
+
+
+def current_deadline():
+    """
+    Returns the absolute monotonic time of the current deadline, or None.
+    """
+    return _deadline.get()
+
+
+def call_timeout(timeout):
+    """
+    Clamps a per-call timeout to the remaining deadline budget.
+
+    Raises:
+        DeadlineExceededError: If the budget is already used up.
+    """
+    remaining = remaining_time()
+    if remaining is None:
+        return timeout
+    if remaining <= 0:
+        raise DeadlineExceededError(
+            "Failed to execute GraphQL query: request deadline exceeded."
+        )
+    return min(timeout, remaining)
+
+
+class RetryPolicy:
+    """
+    Bounded retries with exponential backoff and full jitter.
+    """
+
+    def __init__(self, max_attempts=3, base_delay=0.2, max_delay=2.0):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff(self, attempt):
+        """
+        Returns the delay before retry number `attempt` (1-based).
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+    def delay_within_deadline(self, attempt):
+        """
+        Returns the backoff delay for `attempt`, or None if sleeping that long
+        would leave no time for another call within the current deadline.
+        """
+        delay = self.backoff(attempt)
+        remaining = remaining_time()
+        if remaining is not None and delay >= remaining:
+            return None
+        return delay
+
+
+class CircuitBreaker:
+    """
+    Fails fast while the backend is unhealthy.
+
+    After `failure_threshold` consecutive failures the circuit opens and calls
+    are rejected for `reset_timeout` seconds. Then a single trial call is let
+    through: success closes the circuit, failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """
+        Raises CircuitOpenError if the call must not reach the backend.
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    raise CircuitOpenError(
+                        "Failed to execute GraphQL query: backend circuit is open."
+                    )
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self._trial_in_flight:
+                raise CircuitOpenError(
+                    "Failed to execute GraphQL query: backend circuit is open."
+                )
+            self._trial_in_flight = True
+
+    def release(self):
+        """
+        Frees the trial slot taken by `before_call` when a call ends without
+        telling anything about the backend (an exhausted deadline, a bad
+        response body, a cancelled caller).
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
@@ -0,0 +1,185 @@
+from functools import lru_cache
+
+from src.graphql_client.documents import matching_brace, root_fields, split_operation
+from src.graphql_client.operations import minify
+
+# Fields the tools may select, per GraphQL type. A value of None is a scalar;
+# a string names the type of a nested object.
+SCHEMA = {
+    "Especialidad": {"id": None, "nombre": None},
+    "Rol": {"id": None, "nombre": None},
+    "Nombrado": {"nombre": None},
+    "UsuarioResumen": {"username": None},
+    "Usuario": {"id": None, "username": None, "email": None, "roles": "Rol"},
+    "Medico": {
+        "id": None,
+        "username": None,
+        "email": None,
+        "especialidades": "Especialidad",
+    },
+    "UsuarioEspecialidad": {
+        "usuarioId": None,
+        "usuario": None,
+        "especialidad": None,
+        "turno": None,
+        "horario": None,
+        "dia": None,
+        "fecha": None,
+        "horarioId": None,
+        "disponibilidad": None,
+    },
+    "Cita": {
+        "id": None,
+        "usuario": "UsuarioResumen",
+        "medico": "UsuarioResumen",
+        "especialidad": "Nombrado",
+        "horario": None,
+        "fecha": None,
+        "nombreUsuarioLogeado": None,
+    },
+    "Diagnostico": {
+        "id": None,
+        "descripcion": None,
+        "tratamiento": None,
+        "fecha": None,
+        "nombreMedico": None,
+        "nombrePaciente": None,
+        "especialidad": None,
+    },
+    "Triaje": {
+        "id": None,
+        "paciente": "UsuarioResumen",
+        "enfermera": "UsuarioResumen",
+        "temperatura": None,
+        "peso": None,
+        "estatura": None,
+        "frecuenciaCardiaca": None,
+        "frecuenciaRespiratoria": None,
+        "saturacionOxigeno": None,
+        "alergias": None,
+        "enfermedadesCronicas": None,
+        "motivoConsulta": None,
+        "fecha": None,
+    },
+    "Horario": {
+        "id": None,
+        "fecha": None,
+        "horaInicio": None,
+        "horaFin": None,
+        "disponible": None,
+        "especialidad": "Nombrado",
+        "turno": "Nombrado",
+        "dia": "Nombrado",
+    },
+}
+
+# Type returned by each root field used by the tools.
+ROOT_TYPES = {
+    "especialidades": "Especialidad",
+    "especialidad": "Especialidad",
+    "usuarios": "Usuario",
+    "medicos": "Medico",
+    "usuariosPorEspecialidad": "UsuarioEspecialidad",
+    "citas": "Cita",
+    "citasPorUsuario": "Cita",
+    "citasPorMedico": "Cita",
+    "diagnosticosPorPaciente": "Diagnostico",
+    "triajesPorPaciente": "Triaje",
+    "horariosDisponibles": "Horario",
+}
+
+
+def build_selection(type_name, fields):
+    """
+    Builds a minimal selection set for `type_name` from requested field paths.
+
+    Args:
+        type_name (str): A type from `SCHEMA`, e.g. "Triaje".
+        fields (list[str]): Field names; nested fields use dots
+            ("paciente.username"). Naming an object field alone selects all
+            of its whitelisted subfields.
+
+    Returns:
+        str: The selection set, braces included.
+
+    Raises:
+        ValueError: If a field is not in the whitelist of its type.
+    """
+    tree = {}
+    for path in fields:
+        node, current_type = tree, type_name
+        parts = path.strip().split(".")
+        for index, part in enumerate(parts):
+            allowed = SCHEMA[current_type]
+            if part not in allowed:
+                raise ValueError(
+                    f"Unknown field '{path}' for {current_type}. "
+                    f"Available fields: {', '.join(allowed)}"
+                )
+            nested_type = allowed[part]
+            if nested_type is None:
+                if index != len(parts) - 1:
+                    raise ValueError(
+                        f"Field '{part}' of {current_type} has no subfields."
+                    )
+                node[part] = None
+                break
+            child = node.get(part)
+            if child is None:
+                child = node[part] = {}
+            if index == len(parts) - 1:
+                child.update(
+                    {name: None for name, t in SCHEMA[nested_type].items() if t is None}
+                )
+            node, current_type = child, nested_type
+    return _render(tree)
+
+
+def _render(tree):
+    parts = []
+    for name, child in tree.items():
+        parts.append(name if child is None else name + _render(child))
+    return "{" + " ".join(parts) + "}"
+
+
+def _selection_start(field_text):
+    """
+    Returns the index of the brace opening a root field's selection set,
+    skipping its arguments so braces inside input objects are ignored.
+    """
+    paren = field_text.find("(")
+    brace = field_text.index("{")
+    if 0 <= paren < brace:
+        brace = field_text.index("{", matching_brace(field_text, paren, "(", ")"))
+    return brace
+
+
+@lru_cache(maxsize=256)
+def _project(query, fields):
+    _, body = split_operation(query)
+    ((root, field_text),) = root_fields(body)
+    type_name = ROOT_TYPES.get(root)
+    if type_name is None:
+        raise ValueError(f"Field projection is not available for '{root}'.")
+
+    projected_field = field_text[: _selection_start(field_text)]
+    projected_field += build_selection(type_name, fields)
+    header = query.strip()[: query.strip().index("{")]
+    return minify(f"{header}{{{projected_field}}}")
+
+
+def project_query(query, fields=None):
+    """
+    Returns `query` with its root selection set reduced to `fields`.
+
+    Args:
+        query (str): A single-root query document used by the tools.
+        fields (list[str], optional): The fields to keep. The query is
+            returned unchanged if omitted or empty.
+
+    Raises:
+        ValueError: If a field is not whitelisted for the root type.
+    """
+    if not fields:
+        return query
+    return _project(query, tuple(fields))
@@ -0,0 +1,61 @@
+import copy
+import threading
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from src.graphql_client.errors import DeadlineExceededError
+from src.graphql_client.resilience import remaining_time
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into a single execution.
+
+    The first caller for a key runs the function; callers arriving while it is
+    still in flight wait for that result instead of starting their own call.
+    Nothing is kept once the call finishes, so results are never stale.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """
+        Runs `fn` unless a call for `key` is already in flight, in which case
+        its result (or exception) is shared.
+
+        Raises:
+            DeadlineExceededError: If the caller's deadline passes while it
+                waits for another caller's call.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+
+        if not leader:
+            # Every follower gets its own copy so callers cannot mutate each
+            # other's responses. A follower waits no longer than its own
+            # deadline, whatever the leader's budget is.
+            try:
+                result = future.result(timeout=remaining_time())
+            except FutureTimeoutError:
+                raise DeadlineExceededError(
+                    "Failed to execute GraphQL query: request deadline exceeded."
+                ) from None
+            return copy.deepcopy(result)
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
@@ -0,0 +1,98 @@
+import codecs
+import json
+import re
+
+from src.graphql_client.errors import GraphQLClientError
+
+_WHITESPACE = " \t\n\r"
+
+
+def iter_json_array(chunks, field):
+    """
+    Yields the items of the JSON array stored under `field` as the document
+    arrives, without decoding the whole document first.
+
+    Only the item being decoded is held in memory; everything before it is
+    discarded as soon as it has been yielded.
+
+    Args:
+        chunks (Iterable[bytes]): The raw response body, in arbitrary pieces.
+        field (str): The key of the list to stream, e.g. "citas".
+
+    Raises:
+        GraphQLClientError: If the response carries GraphQL errors instead of
+            the requested list.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    start_re = re.compile(r'"' + re.escape(field) + r'"\s*:\s*(\[|null)')
+    buffer = ""
+    position = None  # Index just after the last consumed array item.
+    done = False
+    chunks = iter(chunks)
+    eof = False
+
+    while not done:
+        chunk = next(chunks, None)
+        if chunk is None:
+            eof = True
+            buffer += text_decoder.decode(b"", final=True)
+        else:
+            buffer += text_decoder.decode(chunk)
+
+        if position is None:
+            match = start_re.search(buffer)
+            if match is None:
+                if eof:
+                    _raise_for_errors(buffer, field)
+                    return
+                continue
+            if match.group(1) == "null":
+                return
+            position = match.end()
+
+        while True:
+            while position < len(buffer) and buffer[position] in _WHITESPACE + ",":
+                position += 1
+            if position >= len(buffer):
+                break
+            if buffer[position] == "]":
+                done = True
+                break
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise GraphQLClientError(
+                        f"Failed to execute GraphQL query: truncated '{field}' list."
+                    )
+                break
+            # A bare value may still be growing ("4" -> "4.5", "tru" -> "true"),
+            # so an item only counts once the next character ends it.
+            following = end
+            while following < len(buffer) and buffer[following] in _WHITESPACE:
+                following += 1
+            if following >= len(buffer) or buffer[following] not in ",]":
+                break
+            yield item
+            position = end
+
+        buffer = buffer[position:]
+        position = 0
+        if eof and not done:
+            raise GraphQLClientError(
+                f"Failed to execute GraphQL query: truncated '{field}' list."
+            )
+
+
+def _raise_for_errors(body, field):
+    try:
+        document = json.loads(body)
+    except json.JSONDecodeError:
+        raise GraphQLClientError(
+            f"Failed to execute GraphQL query: '{field}' not found in response."
+        )
+    errors = document.get("errors") if isinstance(document, dict) else None
+    if errors:
+        messages = "; ".join(error.get("message", "") for error in errors)
+        raise GraphQLClientError(f"Failed to execute GraphQL query: {messages}")
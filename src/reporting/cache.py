@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import secrets
+import shutil
+import threading
+
+from src.reporting.storage import report_storage
+
+# Bump whenever the rendered layout changes so older files are not reused.
+LAYOUT_VERSION = 1
+
+
+def report_key(formato, datos):
+    """
+    Hashes the format, the layout version and the rows of a report. Column
+    order is part of the key, since it changes the rendered file.
+    """
+    digest = hashlib.sha256(f"{formato}|{LAYOUT_VERSION}".encode())
+    for row in datos:
+        digest.update(b"\n")
+        digest.update(
+            json.dumps(list(row.items()), ensure_ascii=False, default=str).encode(
+                "utf-8"
+            )
+        )
+    return digest.hexdigest()[:32]
+
+
+def write_atomically(generator, datos, nombre_archivo, **kwargs):
+    """
+    Renders a report to a temporary file next to `nombre_archivo` and moves it
+    into place, so readers never see a half-written report.
+    """
+    base, extension = os.path.splitext(nombre_archivo)
+    temporary = f"{base}.{secrets.token_hex(4)}.tmp{extension}"
+    try:
+        generator(datos, temporary, **kwargs)
+        if os.path.exists(temporary):
+            os.replace(temporary, nombre_archivo)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+    return nombre_archivo
+
+
+class ReportCache:
+    """
+    Content-addressed report files: a report is stored under the hash of its
+    format and rows, so an identical request reuses the file instead of
+    rendering it again. Retention and disk quota are handled by the report
+    storage.
+    """
+
+    def __init__(self, storage):
+        self.storage = storage
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def path(self, key, extension):
+        """
+        Returns where the report with `key` is stored.
+        """
+        return self.storage.path(f"reporte_{key}.{extension}")
+
+    def get(self, key, extension):
+        """
+        Returns the path of a cached report, or None if it is missing or was
+        evicted. A hit refreshes the report's position in the eviction order.
+        """
+        path = self.path(key, extension)
+        fresh = self.storage.touch(path) and os.path.exists(path)
+        with self._lock:
+            if not fresh:
+                self._misses += 1
+                return None
+            self._hits += 1
+        return path
+
+    def render(self, key, extension, generator, datos, nombre_archivo=None):
+        """
+        Renders a report into the cache. If `nombre_archivo` is given, the
+        cached file is also copied there.
+
+        Returns:
+            str: The path of the report.
+        """
+        path = write_atomically(generator, datos, self.path(key, extension))
+        self.storage.add(path)
+        return self.copy_to(path, nombre_archivo)
+
+    def copy_to(self, path, nombre_archivo=None):
+        """
+        Copies a cached report to `nombre_archivo` and returns the new path,
+        or returns `path` itself if no other name was requested.
+        """
+        if not nombre_archivo or os.path.abspath(nombre_archivo) == os.path.abspath(
+            path
+        ):
+            return path
+        try:
+            shutil.copyfile(path, nombre_archivo)
+        except OSError:
+            self.storage.release(nombre_archivo)
+            raise
+        self.storage.add(nombre_archivo)
+        return nombre_archivo
+
+    def stats(self):
+        """
+        Returns hit and miss counters.
+        """
+        with self._lock:
+            return {"hits": self._hits, "misses": self._misses}
+
+
+report_cache = ReportCache(report_storage)
@@ -0,0 +1,141 @@
+import gzip
+import hashlib
+import os
+import secrets
+import shutil
+import threading
+from collections import OrderedDict
+
+from src.reporting.storage import is_safe_report_name, report_storage
+
+# Text exports compress well, so a gzip copy is kept next to them and served
+# to clients that accept it. PDF, XLSX and Parquet are already compressed.
+REPORT_PRECOMPRESS = os.getenv("REPORT_PRECOMPRESS", "true").lower() == "true"
+REPORT_PRECOMPRESS_MIN_BYTES = int(os.getenv("REPORT_PRECOMPRESS_MIN_BYTES", "1024"))
+_COMPRESSIBLE_EXTENSIONS = {".csv", ".jsonl"}
+
+_ETAG_CACHE_SIZE = 1024
+
+
+def safe_report_path(filename, directory="reports"):
+    """
+    Resolves a requested report name inside `directory`.
+
+    Only plain file names are accepted: no separators, no leading dot, no
+    half-written temporary files and no way to escape the directory through
+    links.
+
+    Returns:
+        str: The path of the report, or None if the name is invalid or the
+        file does not exist.
+    """
+    if not is_safe_report_name(filename):
+        return None
+    root = os.path.realpath(directory)
+    path = os.path.realpath(os.path.join(root, filename))
+    if os.path.dirname(path) != root or not os.path.isfile(path):
+        return None
+    return path
+
+
+class ETagCache:
+    """
+    Strong ETags computed from file contents, remembered per path until the
+    file's size or modification time changes.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        """
+        Returns the quoted ETag of the file at `path`. Reads the whole file on
+        a miss, so call it off the event loop.
+        """
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(path)
+                return entry[1]
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as file:
+            for block in iter(lambda: file.read(1024 * 1024), b""):
+                digest.update(block)
+        etag = f'"{digest.hexdigest()[:32]}"'
+
+        with self._lock:
+            self._entries[path] = (version, etag)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return etag
+
+
+etag_cache = ETagCache(max_entries=_ETAG_CACHE_SIZE)
+
+
+def etag_matches(if_none_match, etag):
+    """
+    Implements the weak comparison used by If-None-Match.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def accepts_gzip(accept_encoding):
+    """
+    Returns True if an Accept-Encoding header allows gzip.
+    """
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding.strip().lower() in ("gzip", "*"):
+            quality = params.strip().removeprefix("q=")
+            try:
+                return not params or float(quality) > 0
+            except ValueError:
+                return True
+    return False
+
+
+def precompressed_variant(path):
+    """
+    Returns the path of an up-to-date gzip copy of `path`, creating it for
+    compressible exports if needed, or None if the file is not worth
+    compressing. Call it off the event loop.
+    """
+    if not REPORT_PRECOMPRESS:
+        return None
+    if os.path.splitext(path)[1].lower() not in _COMPRESSIBLE_EXTENSIONS:
+        return None
+    stat = os.stat(path)
+    if stat.st_size < REPORT_PRECOMPRESS_MIN_BYTES:
+        return None
+
+    compressed = path + ".gz"
+    try:
+        if os.stat(compressed).st_mtime_ns >= stat.st_mtime_ns:
+            return compressed
+    except FileNotFoundError:
+        pass
+
+    temporary = f"{compressed}.{secrets.token_hex(4)}.tmp"
+    try:
+        with open(path, "rb") as source, gzip.open(
+            temporary, "wb", compresslevel=6
+        ) as target:
+            shutil.copyfileobj(source, target, 1024 * 1024)
+        os.replace(temporary, compressed)
+        report_storage.add_variant(path, compressed)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+    return compressed
@@ -1,79 +1,492 @@
+import csv
+import json
+import math
+import multiprocessing
+import os
+import tempfile
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import chain, islice
+
 from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.platypus import LongTable, SimpleDocTemplate, TableStyle
 from reportlab.lib import colors
 import openpyxl
 from openpyxl.utils import get_column_letter
+from pypdf import PdfWriter
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow es opcional; solo lo necesita generar_parquet.
+    pa = pq = None
+
+# Indica si se pueden generar archivos Parquet.
+PARQUET_DISPONIBLE = pa is not None
+
+# A partir de cuántas filas el PDF se renderiza por bloques en paralelo.
+PDF_PARALLEL_MIN_ROWS = int(os.getenv("PDF_PARALLEL_MIN_ROWS", "10000"))
+# Filas de cada bloque; cada bloque es un PDF independiente que luego se une.
+PDF_ROWS_PER_CHUNK = int(os.getenv("PDF_ROWS_PER_CHUNK", "2000"))
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(os.cpu_count() or 1)))
+
+# Filas usadas para calcular el ancho de las columnas y el alto de las filas.
+_FILAS_MUESTRA = 500
+
+# Filas por grupo de filas (row group) de Parquet y por lote de CSV/JSONL.
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "10000"))
+
+# Límite de filas de una hoja de Excel, encabezado incluido.
+EXCEL_MAX_ROWS = 1048576
+_ANCHO_MAXIMO_EXCEL = 60
 
+ESTILO_TABLA = TableStyle(
+    [
+        ("BACKGROUND", (0, 0), (-1, 0), colors.grey),
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
+        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("BOTTOMPADDING", (0, 0), (-1, 0), 12),
+        ("BACKGROUND", (0, 1), (-1, -1), colors.beige),
+        ("GRID", (0, 0), (-1, -1), 1, colors.black),
+    ]
+)
 
-def generar_pdf(datos: list[dict], nombre_archivo: str = "reporte.pdf"):
+
+def generar_pdf(
+    datos: list[dict],
+    nombre_archivo: str = "reporte.pdf",
+    progreso=None,
+    paralelo: bool = None,
+):
     """
     Genera un archivo PDF a partir de una lista de diccionarios.
 
+    Las filas se maquetan en tablas de una página que se crean a medida que
+    ReportLab las necesita, de modo que la memoria no crece con el número de
+    filas y el tiempo crece de forma lineal.
+
     Args:
         datos (list[dict]): Una lista de diccionarios con los datos.
         nombre_archivo (str, optional): El nombre del archivo PDF a generar.
+        progreso (callable, optional): Se llama con la fracción completada (0 a 1).
+        paralelo (bool, optional): Renderiza el PDF por bloques en varios
+            procesos. Por defecto se activa a partir de PDF_PARALLEL_MIN_ROWS filas.
     """
     if not datos:
         print("No hay datos para generar el PDF.")
         return
 
-    doc = SimpleDocTemplate(nombre_archivo, pagesize=letter)
-    elementos = []
-
-    # Extraer encabezados y datos
+    # Extraer encabezados, y medir columnas y filas con una muestra. Los
+    # valores se toman por nombre de columna, no por posición.
     encabezados = list(datos[0].keys())
-    data_para_tabla = [encabezados] + [list(d.values()) for d in datos]
+    muestra = [[d.get(h) for h in encabezados] for d in datos[:_FILAS_MUESTRA]]
+    anchos = _anchos_columnas(encabezados, muestra)
+    filas_por_pagina = _filas_por_pagina(encabezados, muestra, anchos)
+
+    if paralelo is None:
+        paralelo = len(datos) >= PDF_PARALLEL_MIN_ROWS and PDF_WORKERS > 1
+    if paralelo:
+        _generar_pdf_paralelo(
+            encabezados, datos, anchos, filas_por_pagina, nombre_archivo, progreso
+        )
+    else:
+        filas = ([d.get(h) for h in encabezados] for d in datos)
+        _construir_pdf(
+            nombre_archivo,
+            encabezados,
+            filas,
+            len(datos),
+            anchos,
+            filas_por_pagina,
+            progreso,
+        )
+    if progreso is not None:
+        progreso(1.0)
+    print(f"Archivo PDF '{nombre_archivo}' generado exitosamente.")
+
+
+def _nuevo_documento(nombre_archivo):
+    return SimpleDocTemplate(nombre_archivo, pagesize=letter)
+
+
+def _tabla_pdf(encabezados, filas, anchos=None):
+    """
+    Crea una tabla del reporte. Si no cabe en la página, el encabezado se
+    repite en la siguiente.
+    """
+    tabla = LongTable([encabezados] + filas, colWidths=anchos, repeatRows=1)
+    tabla.setStyle(ESTILO_TABLA)
+    return tabla
+
+
+def _anchos_columnas(encabezados, filas):
+    """
+    Calcula el ancho de cada columna a partir del encabezado y una muestra de
+    filas, para que todas las tablas del PDF queden alineadas sin tener que
+    medir el conjunto completo.
+    """
+    anchos = []
+    for i, encabezado in enumerate(encabezados):
+        ancho = stringWidth(str(encabezado), "Helvetica-Bold", 10)
+        for fila in filas:
+            ancho = max(ancho, stringWidth(str(fila[i]), "Helvetica", 10))
+        # Relleno izquierdo y derecho por defecto de las celdas.
+        anchos.append(ancho + 12)
+    return anchos
+
+
+def _filas_por_pagina(encabezados, filas, anchos):
+    """
+    Calcula cuántas filas caben en una página junto al encabezado, usando la
+    fila más alta de la muestra.
+    """
+    doc = _nuevo_documento(os.devnull)
+    alto_disponible = doc.height - 12  # Relleno superior e inferior del marco.
+    tabla = _tabla_pdf(encabezados, filas, anchos)
+    tabla.wrap(doc.width, alto_disponible)
+    alto_encabezado = tabla._rowHeights[0]
+    alto_fila = max(tabla._rowHeights[1:])
+    return max(1, int((alto_disponible - alto_encabezado) // alto_fila))
 
-    # Crear la tabla
-    tabla = Table(data_para_tabla)
 
-    # Estilo de la tabla
-    estilo = TableStyle(
+class _TablasPorPagina:
+    """
+    Lista perezosa de tablas de una página para `SimpleDocTemplate.build`.
+
+    ReportLab consume siempre la cabeza de la lista (y puede insertar delante
+    los trozos de una tabla partida), así que basta con crear cada tabla
+    cuando llega su turno: solo la página en curso vive en memoria.
+    """
+
+    def __init__(self, encabezados, filas, total, anchos, filas_por_pagina):
+        self._encabezados = encabezados
+        self._filas = iter(filas)
+        self._anchos = anchos
+        self._filas_por_pagina = filas_por_pagina
+        self._pendientes = []
+        self._sin_crear = math.ceil(total / filas_por_pagina)
+
+    def _crear(self, cantidad):
+        while len(self._pendientes) < cantidad and self._sin_crear:
+            self._sin_crear -= 1
+            bloque = list(islice(self._filas, self._filas_por_pagina))
+            if bloque:
+                self._pendientes.append(
+                    _tabla_pdf(self._encabezados, bloque, self._anchos)
+                )
+
+    def __len__(self):
+        return len(self._pendientes) + self._sin_crear
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            self._crear(len(self))
+        else:
+            self._crear(indice + 1)
+        return self._pendientes[indice]
+
+    def __setitem__(self, indice, valor):
+        self._pendientes[indice] = valor
+
+    def insert(self, indice, valor):
+        self._pendientes.insert(indice, valor)
+
+    def __delitem__(self, indice):
+        self._crear(1)
+        del self._pendientes[indice]
+
+
+def _construir_pdf(
+    nombre_archivo, encabezados, filas, total, anchos, filas_por_pagina, progreso=None
+):
+    """
+    Escribe las filas en un PDF, una tabla por página.
+    """
+    doc = _nuevo_documento(nombre_archivo)
+    if progreso is not None:
+        doc.setProgressCallBack(_callback_progreso_pdf(progreso))
+    doc.build(_TablasPorPagina(encabezados, filas, total, anchos, filas_por_pagina))
+    return nombre_archivo
+
+
+def _generar_pdf_paralelo(
+    encabezados, datos, anchos, filas_por_pagina, nombre_archivo, progreso=None
+):
+    """
+    Divide las filas en bloques de páginas completas, los renderiza en un pool
+    de procesos y une los PDF resultantes en orden.
+    """
+    filas_por_bloque = max(1, PDF_ROWS_PER_CHUNK // filas_por_pagina)
+    filas_por_bloque *= filas_por_pagina
+    bloques = [
         [
-            ("BACKGROUND", (0, 0), (-1, 0), colors.grey),
-            ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
-            ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-            ("BOTTOMPADDING", (0, 0), (-1, 0), 12),
-            ("BACKGROUND", (0, 1), (-1, -1), colors.beige),
-            ("GRID", (0, 0), (-1, -1), 1, colors.black),
+            [d.get(h) for h in encabezados]
+            for d in datos[inicio : inicio + filas_por_bloque]
+        ]
+        for inicio in range(0, len(datos), filas_por_bloque)
+    ]
+    with tempfile.TemporaryDirectory() as directorio:
+        rutas = [
+            os.path.join(directorio, f"bloque_{i:05d}.pdf") for i in range(len(bloques))
         ]
-    )
-    tabla.setStyle(estilo)
+        # "spawn" evita hacer fork de un proceso que tiene hilos del servidor.
+        contexto = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=min(PDF_WORKERS, len(bloques)), mp_context=contexto
+        ) as pool:
+            futuros = [
+                pool.submit(
+                    _construir_pdf,
+                    ruta,
+                    encabezados,
+                    bloque,
+                    len(bloque),
+                    anchos,
+                    filas_por_pagina,
+                )
+                for bloque, ruta in zip(bloques, rutas)
+            ]
+            for completados, futuro in enumerate(as_completed(futuros), 1):
+                futuro.result()
+                if progreso is not None:
+                    # La unión de los bloques queda para el último 10 %.
+                    progreso(0.9 * completados / len(futuros))
 
-    elementos.append(tabla)
-    doc.build(elementos)
-    print(f"Archivo PDF '{nombre_archivo}' generado exitosamente.")
+        writer = PdfWriter()
+        for ruta in rutas:
+            writer.append(ruta)
+        with open(nombre_archivo, "wb") as archivo:
+            writer.write(archivo)
+
+
+def _callback_progreso_pdf(progreso):
+    """
+    Adapta el callback de progreso de ReportLab a una fracción entre 0 y 1.
+    """
+    total = {"valor": 0}
+
+    def callback(tipo, valor):
+        if tipo == "SIZE_EST":
+            total["valor"] = valor
+        elif tipo == "PROGRESS" and total["valor"]:
+            progreso(min(valor / total["valor"], 0.99))
+
+    return callback
 
 
-def generar_excel(datos: list[dict], nombre_archivo: str = "reporte.xlsx"):
+def generar_excel(
+    datos: Iterable[dict], nombre_archivo: str = "reporte.xlsx", progreso=None
+):
     """
-    Genera un archivo Excel a partir de una lista de diccionarios.
+    Genera un archivo Excel a partir de filas de diccionarios.
+
+    Usa un libro de solo escritura, así que las filas se escriben a disco a
+    medida que llegan y la memoria no crece con su número. El ancho de las
+    columnas se calcula con una muestra de las primeras filas, y los datos que
+    superan el límite de filas de Excel continúan en hojas nuevas.
 
     Args:
-        datos (list[dict]): Una lista de diccionarios con los datos.
+        datos (Iterable[dict]): Una lista o un iterador de diccionarios.
         nombre_archivo (str, optional): El nombre del archivo Excel a generar.
+        progreso (callable, optional): Se llama con la fracción completada
+            (0 a 1). Solo se informa el avance parcial si `datos` tiene longitud.
     """
-    if not datos:
+    total = len(datos) if hasattr(datos, "__len__") else None
+    filas = iter(datos)
+    muestra = list(islice(filas, _FILAS_MUESTRA))
+    if not muestra:
         print("No hay datos para generar el Excel.")
         return
 
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Reporte"
+    encabezados = list(muestra[0].keys())
+    anchos = _anchos_excel(encabezados, muestra)
 
-    # Escribir encabezados
-    encabezados = list(datos[0].keys())
+    wb = openpyxl.Workbook(write_only=True)
+    ws = None
+    filas_en_hoja = EXCEL_MAX_ROWS
+    for i, fila in enumerate(chain(muestra, filas), 1):
+        if filas_en_hoja == EXCEL_MAX_ROWS:
+            ws = _nueva_hoja_excel(wb, encabezados, anchos)
+            filas_en_hoja = 1
+        ws.append([fila.get(h) for h in encabezados])
+        filas_en_hoja += 1
+        if progreso is not None and total and i % 1000 == 0:
+            # La escritura del archivo queda para el último 10 %.
+            progreso(0.9 * i / total)
+
+    wb.save(nombre_archivo)
+    if progreso is not None:
+        progreso(1.0)
+    print(f"Archivo Excel '{nombre_archivo}' generado exitosamente.")
+
+
+def _anchos_excel(encabezados, filas):
+    """
+    Calcula el ancho de cada columna, en caracteres, con el encabezado y una
+    muestra de filas.
+    """
+    anchos = []
+    for encabezado in encabezados:
+        largo = max(
+            [len(str(encabezado))]
+            + [len(str(fila.get(encabezado, ""))) for fila in filas]
+        )
+        anchos.append(min(largo + 2, _ANCHO_MAXIMO_EXCEL))
+    return anchos
+
+
+def _nueva_hoja_excel(wb, encabezados, anchos):
+    """
+    Crea una hoja con el encabezado. Las hojas siguientes a la primera se
+    numeran ("Reporte (2)", "Reporte (3)", ...).
+    """
+    numero = len(wb.worksheets) + 1
+    ws = wb.create_sheet("Reporte" if numero == 1 else f"Reporte ({numero})")
+    # En un libro de solo escritura los anchos se fijan antes de escribir filas.
+    for i, ancho in enumerate(anchos, 1):
+        ws.column_dimensions[get_column_letter(i)].width = ancho
     ws.append(encabezados)
+    return ws
 
-    # Escribir datos
-    for fila in datos:
-        ws.append(list(fila.values()))
 
-    # Autoajustar el ancho de las columnas
-    for i, columna in enumerate(encabezados, 1):
-        letra_columna = get_column_letter(i)
-        ws.column_dimensions[letra_columna].autosize = True
+def generar_csv(
+    datos: Iterable[dict], nombre_archivo: str = "reporte.csv", progreso=None
+):
+    """
+    Genera un archivo CSV (UTF-8, separado por comas) a partir de filas de
+    diccionarios, escribiéndolas a medida que llegan.
 
-    wb.save(nombre_archivo)
-    print(f"Archivo Excel '{nombre_archivo}' generado exitosamente.")
+    Args:
+        datos (Iterable[dict]): Una lista o un iterador de diccionarios.
+        nombre_archivo (str, optional): El nombre del archivo CSV a generar.
+        progreso (callable, optional): Se llama con la fracción completada (0 a 1).
+    """
+    total = len(datos) if hasattr(datos, "__len__") else None
+    filas = iter(datos)
+    primera = next(filas, None)
+    if primera is None:
+        print("No hay datos para generar el CSV.")
+        return
+
+    with open(nombre_archivo, "w", newline="", encoding="utf-8") as archivo:
+        writer = csv.DictWriter(
+            archivo, fieldnames=list(primera.keys()), extrasaction="ignore"
+        )
+        writer.writeheader()
+        for escritas, lote in _lotes(chain([primera], filas)):
+            writer.writerows(lote)
+            _informar_progreso(progreso, escritas, total)
+
+    if progreso is not None:
+        progreso(1.0)
+    print(f"Archivo CSV '{nombre_archivo}' generado exitosamente.")
+
+
+def generar_jsonl(
+    datos: Iterable[dict], nombre_archivo: str = "reporte.jsonl", progreso=None
+):
+    """
+    Genera un archivo JSON Lines (un objeto JSON por línea) a partir de filas
+    de diccionarios, escribiéndolas a medida que llegan.
+
+    Args:
+        datos (Iterable[dict]): Una lista o un iterador de diccionarios.
+        nombre_archivo (str, optional): El nombre del archivo JSONL a generar.
+        progreso (callable, optional): Se llama con la fracción completada (0 a 1).
+    """
+    total = len(datos) if hasattr(datos, "__len__") else None
+    filas = iter(datos)
+    primera = next(filas, None)
+    if primera is None:
+        print("No hay datos para generar el JSONL.")
+        return
+
+    with open(nombre_archivo, "w", encoding="utf-8") as archivo:
+        for escritas, lote in _lotes(chain([primera], filas)):
+            archivo.writelines(
+                json.dumps(fila, ensure_ascii=False, default=str) + "\n"
+                for fila in lote
+            )
+            _informar_progreso(progreso, escritas, total)
+
+    if progreso is not None:
+        progreso(1.0)
+    print(f"Archivo JSONL '{nombre_archivo}' generado exitosamente.")
+
+
+def generar_parquet(
+    datos: Iterable[dict], nombre_archivo: str = "reporte.parquet", progreso=None
+):
+    """
+    Genera un archivo Parquet a partir de filas de diccionarios. Las filas se
+    escriben por grupos de EXPORT_BATCH_ROWS, así que solo un grupo vive en
+    memoria a la vez.
+
+    El esquema se deduce del primer grupo; las columnas sin ningún valor en
+    él se guardan como texto.
+
+    Args:
+        datos (Iterable[dict]): Una lista o un iterador de diccionarios.
+        nombre_archivo (str, optional): El nombre del archivo Parquet a generar.
+        progreso (callable, optional): Se llama con la fracción completada (0 a 1).
+
+    Raises:
+        RuntimeError: Si pyarrow no está instalado.
+    """
+    if pa is None:
+        raise RuntimeError(
+            "Parquet export requires pyarrow. Install it with 'pip install pyarrow'."
+        )
+    total = len(datos) if hasattr(datos, "__len__") else None
+    writer = None
+    try:
+        for escritas, lote in _lotes(datos):
+            if writer is None:
+                esquema = _esquema_parquet(lote)
+                writer = pq.ParquetWriter(nombre_archivo, esquema)
+            writer.write_table(pa.Table.from_pylist(lote, schema=esquema))
+            _informar_progreso(progreso, escritas, total)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if writer is None:
+        print("No hay datos para generar el Parquet.")
+        return
+    if progreso is not None:
+        progreso(1.0)
+    print(f"Archivo Parquet '{nombre_archivo}' generado exitosamente.")
+
+
+def _esquema_parquet(filas):
+    """
+    Deduce el esquema de Arrow de un lote de filas, usando texto para las
+    columnas que solo tienen valores nulos.
+    """
+    esquema = pa.Table.from_pylist(filas).schema
+    for i, campo in enumerate(esquema):
+        if pa.types.is_null(campo.type):
+            esquema = esquema.set(i, pa.field(campo.name, pa.string()))
+    return esquema
+
+
+def _lotes(filas):
+    """
+    Agrupa las filas en listas de EXPORT_BATCH_ROWS y devuelve, junto a cada
+    lote, cuántas filas van escritas al terminarlo.
+    """
+    filas = iter(filas)
+    escritas = 0
+    while True:
+        lote = list(islice(filas, EXPORT_BATCH_ROWS))
+        if not lote:
+            return
+        escritas += len(lote)
+        yield escritas, lote
+
+
+def _informar_progreso(progreso, escritas, total):
+    if progreso is not None and total:
+        progreso(min(escritas / total, 0.99))
@@ -0,0 +1,231 @@
+import multiprocessing
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from src.reporting.cache import write_atomically
+from src.reporting.storage import report_storage
+from src.reporting.generator import (
+    generar_csv,
+    generar_excel,
+    generar_jsonl,
+    generar_parquet,
+    generar_pdf,
+)
+
+# ReportLab and openpyxl are CPU-bound, so reports render in worker processes.
+REPORT_WORKERS = int(
+    os.getenv("REPORT_WORKERS", str(max(1, (os.cpu_count() or 2) // 2)))
+)
+# Jobs accepted but not finished yet; further submissions are rejected.
+REPORT_MAX_PENDING = int(os.getenv("REPORT_MAX_PENDING", "32"))
+# Finished jobs remembered for status and download lookups.
+REPORT_MAX_FINISHED = int(os.getenv("REPORT_MAX_FINISHED", "500"))
+
+_GENERADORES = {
+    "pdf": generar_pdf,
+    "excel": generar_excel,
+    "csv": generar_csv,
+    "jsonl": generar_jsonl,
+    "parquet": generar_parquet,
+}
+
+
+def _render(formato, datos, nombre_archivo, job_id, progress):
+    """
+    Runs inside a worker process. Progress is published through a manager
+    dict shared with the parent process.
+    """
+
+    def report_progress(fraction):
+        progress[job_id] = fraction
+
+    return write_atomically(
+        _GENERADORES[formato], datos, nombre_archivo, progreso=report_progress
+    )
+
+
+class ReportJob:
+    """
+    A report queued for background rendering.
+    """
+
+    def __init__(self, job_id, formato, path, rows):
+        self.id = job_id
+        self.formato = formato
+        self.path = path
+        self.rows = rows
+        self.status = "queued"
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+
+    def to_dict(self, progress=0.0):
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "progress": round(progress, 3),
+            "format": self.formato,
+            "rows": self.rows,
+            "path": self.path if self.status == "done" else None,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class ReportQueueFullError(RuntimeError):
+    """
+    Raised when too many reports are already waiting to be rendered.
+    """
+
+
+class ReportJobQueue:
+    """
+    Bounded queue of report jobs rendered on a process pool.
+    """
+
+    def __init__(self, max_workers=2, max_pending=32, max_finished=500):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.max_finished = max_finished
+        self._jobs = OrderedDict()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._pool = None
+        self._manager = None
+        self._progress = None
+
+    def _ensure_pool(self):
+        # "spawn" avoids forking a process that is running server threads.
+        context = multiprocessing.get_context("spawn")
+        if self._manager is None:
+            self._manager = context.Manager()
+            self._progress = self._manager.dict()
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=context
+            )
+
+    def _drop_pool(self):
+        # Called with the lock held. A pool whose worker died (e.g. killed for
+        # running out of memory on a huge report) rejects every new job, so it
+        # is replaced by a fresh one on the next submission.
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+    def _submit(self, formato, datos, nombre_archivo, job_id):
+        # Called with the lock held.
+        self._ensure_pool()
+        try:
+            return self._pool.submit(
+                _render, formato, datos, nombre_archivo, job_id, self._progress
+            )
+        except BrokenProcessPool:
+            self._drop_pool()
+            self._ensure_pool()
+            return self._pool.submit(
+                _render, formato, datos, nombre_archivo, job_id, self._progress
+            )
+
+    def submit(self, formato, datos, nombre_archivo):
+        """
+        Queues a report for rendering and returns immediately.
+
+        Args:
+            formato (str): "pdf", "excel", "csv", "jsonl" or "parquet".
+            datos (list[dict]): The rows of the report.
+            nombre_archivo (str): Where the report will be written.
+
+        Returns:
+            ReportJob: The queued job.
+
+        Raises:
+            ReportQueueFullError: If `max_pending` jobs are already waiting.
+        """
+        if formato not in _GENERADORES:
+            raise ValueError(f"Unknown report format: {formato}")
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise ReportQueueFullError(
+                    "Too many reports are being generated. Please try again later."
+                )
+            self._ensure_pool()
+            job = ReportJob(
+                "job_" + secrets.token_hex(6), formato, nombre_archivo, len(datos)
+            )
+            self._jobs[job.id] = job
+            self._progress[job.id] = 0.0
+            self._pending += 1
+            try:
+                future = self._submit(formato, datos, nombre_archivo, job.id)
+            except BaseException:
+                # Nothing will ever finish this job.
+                del self._jobs[job.id]
+                self._progress.pop(job.id, None)
+                self._pending -= 1
+                raise
+            job.status = "running" if future.running() else "queued"
+        future.add_done_callback(lambda f, job=job: self._finish(job, f))
+        return job
+
+    def _finish(self, job, future):
+        with self._lock:
+            self._pending -= 1
+            job.finished_at = time.time()
+            error = future.exception()
+            if error is None:
+                job.status = "done"
+                self._progress[job.id] = 1.0
+                report_storage.add(job.path)
+            else:
+                job.status = "failed"
+                job.error = str(error)
+                report_storage.release(job.path)
+            finished = [j for j in self._jobs.values() if j.finished_at is not None]
+            for old in finished[: max(0, len(finished) - self.max_finished)]:
+                del self._jobs[old.id]
+                self._progress.pop(old.id, None)
+
+    def get(self, job_id):
+        """
+        Returns the job with `job_id`, or None if it is unknown.
+        """
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def status(self, job_id):
+        """
+        Returns the job's status, progress and, once done, its file path.
+        """
+        job = self.get(job_id)
+        if job is None:
+            return None
+        progress = (
+            self._progress.get(job_id, 0.0) if self._progress is not None else 0.0
+        )
+        if job.status == "queued" and progress > 0:
+            job.status = "running"
+        return job.to_dict(progress)
+
+    def shutdown(self):
+        """
+        Stops the worker processes, waiting for running reports to finish.
+        """
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+        if self._manager is not None:
+            self._manager.shutdown()
+        self._pool = self._manager = self._progress = None
+
+
+report_jobs = ReportJobQueue(
+    max_workers=REPORT_WORKERS,
+    max_pending=REPORT_MAX_PENDING,
+    max_finished=REPORT_MAX_FINISHED,
+)
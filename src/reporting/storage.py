@@ -0,0 +1,400 @@
+import json
+import os
+import re
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: index saves are merged without a file lock.
+    fcntl = None
+
+# Disk quota of the reports directory, and how long a report is kept after it
+# was last created, reused or downloaded.
+REPORT_STORAGE_MAX_BYTES = int(os.getenv("REPORT_STORAGE_MAX_BYTES", str(1024**3)))
+REPORT_STORAGE_MAX_AGE = float(os.getenv("REPORT_STORAGE_MAX_AGE", "86400"))
+# Seconds between background cleanups and index saves.
+REPORT_STORAGE_CLEANUP_INTERVAL = float(
+    os.getenv("REPORT_STORAGE_CLEANUP_INTERVAL", "300")
+)
+
+_INDEX_NAME = ".index.json"
+_LOCK_NAME = ".index.lock"
+
+# Characters a report name may use. Names are part of the download URL, so
+# anything else is replaced when the report is written.
+_SAFE_NAME_RE = re.compile(r"^\w[\w.-]*$")
+_UNSAFE_CHARS_RE = re.compile(r"[^\w.-]+")
+
+
+def is_safe_report_name(name):
+    """
+    Returns True if `name` is a plain report file name that can be served:
+    only letters, digits, "_", "-" and ".", no leading dot, no ".." and not
+    a temporary file still being written.
+    """
+    return bool(_SAFE_NAME_RE.match(name)) and ".." not in name and ".tmp" not in name
+
+
+def safe_report_name(name):
+    """
+    Turns a requested file name into one `is_safe_report_name` accepts
+    ("Reporte de citas.pdf" becomes "Reporte_de_citas.pdf").
+    """
+    base, extension = os.path.splitext(os.path.basename(name))
+    base = _UNSAFE_CHARS_RE.sub("_", base).lstrip("._-") or "reporte"
+    name = base + _UNSAFE_CHARS_RE.sub("", extension)
+    return re.sub(r"\.{2,}", ".", name).replace(".tmp", "_tmp")
+
+
+class ReportStorage:
+    """
+    Owns the files in the reports directory.
+
+    Every report is recorded in an index with its size, creation time and
+    last use, so listing and cleanup never scan the directory. A background
+    thread removes reports older than `max_age` and then the least recently
+    used ones until the directory fits in `max_bytes`, and saves the index.
+
+    The directory is scanned once, when the index is loaded, so reports
+    missing from a stale index (written after the last save before a crash)
+    are counted too. Several server processes share the index file: each
+    save takes a lock file, merges in what the other processes saved since
+    (their new reports, removals and usage times) and writes the result, so
+    every process sees the others' reports within one cleanup interval.
+    """
+
+    def __init__(
+        self, directory="reports", max_bytes=1024**3, max_age=86400.0, interval=300.0
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.interval = interval
+        self._entries = None
+        self._reserved = set()
+        # Reports this process added or removed since its last save, so a
+        # merge can tell them from changes made by other processes.
+        self._added = set()
+        self._removed = set()
+        self._dirty = False
+        self._lock = threading.RLock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def _index_path(self):
+        return os.path.join(self.directory, _INDEX_NAME)
+
+    @contextmanager
+    def _index_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.directory, _LOCK_NAME), "a") as file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(file, fcntl.LOCK_UN)
+
+    def _read_index(self):
+        try:
+            with open(self._index_path, encoding="utf-8") as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _load(self):
+        # Called with the lock held.
+        if self._entries is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._entries = self._read_index() or {}
+        # The index on disk may be stale: reports written after its last save
+        # (before a crash) must still count.
+        found = self._scan()
+        for name in set(self._entries) - set(found):
+            del self._entries[name]
+            self._removed.add(name)
+            self._dirty = True
+        for name, entry in found.items():
+            if name not in self._entries:
+                self._entries[name] = entry
+                self._added.add(name)
+                self._dirty = True
+
+    def _merge(self, saved):
+        # Called with the lock held. `saved` is the index last written by any
+        # process.
+        for name in list(self._entries):
+            if name not in saved and name not in self._added:
+                # Removed by another process.
+                del self._entries[name]
+        for name, theirs in saved.items():
+            mine = self._entries.get(name)
+            if mine is None:
+                if name not in self._removed:
+                    self._entries[name] = theirs
+                continue
+            if name not in self._added and theirs["created"] > mine["created"]:
+                # Written again by another process.
+                mine.update(
+                    size=theirs["size"],
+                    created=theirs["created"],
+                    variants=theirs["variants"],
+                )
+            elif set(theirs["variants"]) - set(mine["variants"]):
+                mine["variants"] = sorted(set(mine["variants"] + theirs["variants"]))
+                mine["size"] = max(mine["size"], theirs["size"])
+            mine["last_used"] = max(mine["last_used"], theirs["last_used"])
+            downloads = [
+                when
+                for when in (mine["last_downloaded"], theirs["last_downloaded"])
+                if when is not None
+            ]
+            mine["last_downloaded"] = max(downloads) if downloads else None
+
+    def _scan(self):
+        entries = {}
+        for entry in os.scandir(self.directory):
+            if (
+                not entry.is_file()
+                or entry.name.startswith(".")
+                or ".tmp" in entry.name
+            ):
+                continue
+            if entry.name.endswith(".gz") and os.path.exists(entry.path[:-3]):
+                continue
+            stat = entry.stat()
+            variants = (
+                [entry.name + ".gz"] if os.path.exists(entry.path + ".gz") else []
+            )
+            size = stat.st_size + sum(
+                os.path.getsize(os.path.join(self.directory, v)) for v in variants
+            )
+            entries[entry.name] = {
+                "size": size,
+                "created": stat.st_mtime,
+                "last_used": stat.st_mtime,
+                "last_downloaded": None,
+                "variants": variants,
+            }
+        return entries
+
+    def path(self, name):
+        """
+        Returns the path of the report called `name`.
+        """
+        return os.path.join(self.directory, name)
+
+    def unique_path(self, nombre_archivo):
+        """
+        Returns a path in the reports directory for `nombre_archivo` that no
+        other report uses and that can be downloaded: unsafe characters are
+        replaced and a random suffix is added if the name is taken. The name
+        stays reserved until the report is added.
+        """
+        name = safe_report_name(nombre_archivo)
+        base, extension = os.path.splitext(name)
+        with self._lock:
+            self._load()
+            while (
+                name in self._entries
+                or name in self._reserved
+                or os.path.exists(self.path(name))
+            ):
+                name = f"{base}_{secrets.token_hex(3)}{extension}"
+            self._reserved.add(name)
+        return self.path(name)
+
+    def add(self, path):
+        """
+        Records a report written to `path` and schedules a cleanup if the
+        directory is over quota.
+        """
+        name = os.path.basename(path)
+        size = os.path.getsize(path)
+        now = time.time()
+        with self._lock:
+            self._load()
+            self._reserved.discard(name)
+            self._added.add(name)
+            self._removed.discard(name)
+            entry = self._entries.get(name)
+            if entry is None:
+                self._entries[name] = {
+                    "size": size,
+                    "created": now,
+                    "last_used": now,
+                    "last_downloaded": None,
+                    "variants": [],
+                }
+            else:
+                entry.update(size=size, created=now, last_used=now, variants=[])
+            self._dirty = True
+            over_quota = self._total_size() > self.max_bytes
+        self._ensure_thread()
+        if over_quota:
+            self._wake.set()
+
+    def add_variant(self, path, variant_path):
+        """
+        Records a derived file (such as a gzip copy) that lives and dies with
+        the report at `path`.
+        """
+        name, variant = os.path.basename(path), os.path.basename(variant_path)
+        with self._lock:
+            self._load()
+            entry = self._entries.get(name)
+            if entry is None or variant in entry["variants"]:
+                return
+            entry["variants"].append(variant)
+            entry["size"] += os.path.getsize(variant_path)
+            self._dirty = True
+
+    def release(self, path):
+        """
+        Frees a name reserved by `unique_path` whose report was not written.
+        """
+        with self._lock:
+            self._reserved.discard(os.path.basename(path))
+
+    def get(self, name):
+        """
+        Returns a copy of the index entry of `name`, or None if unknown.
+        """
+        with self._lock:
+            self._load()
+            entry = self._entries.get(name)
+            return dict(entry, name=name) if entry is not None else None
+
+    def touch(self, path, downloaded=False):
+        """
+        Marks a report as used now, moving it to the back of the eviction
+        order. Returns False if the report is not in the index.
+        """
+        name = os.path.basename(path)
+        now = time.time()
+        with self._lock:
+            self._load()
+            entry = self._entries.get(name)
+            if entry is None:
+                return False
+            entry["last_used"] = now
+            if downloaded:
+                entry["last_downloaded"] = now
+            self._dirty = True
+            return True
+
+    def list(self):
+        """
+        Returns the indexed reports, most recently used first.
+        """
+        with self._lock:
+            self._load()
+            entries = [dict(entry, name=name) for name, entry in self._entries.items()]
+        return sorted(entries, key=lambda entry: entry["last_used"], reverse=True)
+
+    def _total_size(self):
+        return sum(entry["size"] for entry in self._entries.values())
+
+    def cleanup(self):
+        """
+        Removes expired reports, then the least recently used ones until the
+        directory fits in the quota.
+
+        Returns:
+            list[str]: The names of the removed reports.
+        """
+        now = time.time()
+        with self._lock:
+            self._load()
+            total = self._total_size()
+            victims = []
+            for name, entry in sorted(
+                self._entries.items(), key=lambda item: item[1]["last_used"]
+            ):
+                if now - entry["last_used"] < self.max_age and total <= self.max_bytes:
+                    break
+                victims.append((name, entry))
+                total -= entry["size"]
+            for name, _ in victims:
+                del self._entries[name]
+                self._added.discard(name)
+                self._removed.add(name)
+            if victims:
+                self._dirty = True
+
+        for name, entry in victims:
+            for file_name in [name] + entry["variants"]:
+                try:
+                    os.remove(self.path(file_name))
+                except FileNotFoundError:
+                    pass
+        return [name for name, _ in victims]
+
+    def save(self):
+        """
+        Merges the index saved by other processes into this one and writes
+        the result to disk if this process changed anything.
+        """
+        with self._lock:
+            if self._entries is None:
+                return
+        with self._index_lock():
+            saved = self._read_index()
+            with self._lock:
+                if saved is not None:
+                    self._merge(saved)
+                if not self._dirty:
+                    return
+                data = json.dumps(self._entries)
+                self._added.clear()
+                self._removed.clear()
+                self._dirty = False
+            temporary = f"{self._index_path}.{secrets.token_hex(4)}.tmp"
+            with open(temporary, "w", encoding="utf-8") as file:
+                file.write(data)
+            os.replace(temporary, self._index_path)
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name="report-storage", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.cleanup()
+                self.save()
+            except OSError as e:
+                print(f"Error cleaning up reports: {e}")
+
+    def close(self):
+        """
+        Stops the background cleanup and saves the index.
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            self._wake.set()
+            thread.join()
+        self.save()
+
+
+report_storage = ReportStorage(
+    max_bytes=REPORT_STORAGE_MAX_BYTES,
+    max_age=REPORT_STORAGE_MAX_AGE,
+    interval=REPORT_STORAGE_CLEANUP_INTERVAL,
+)
@@ -0,0 +1,166 @@
+import asyncio
+import os
+import threading
+import time
+import types
+
+import pytest
+
+# The agent module refuses to load without an API key; no model call is made.
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+
+from src.agent import main  # noqa: E402
+from src.agent.prompt_cache import PromptCache  # noqa: E402
+
+
+def _part(text="", call=None):
+    return types.SimpleNamespace(
+        text=text, function_call=call or types.SimpleNamespace(name="", args={})
+    )
+
+
+def _call(name, **args):
+    return _part(call=types.SimpleNamespace(name=name, args=args))
+
+
+class _Chat:
+    """
+    Plays back one list of parts per model turn, in chunks of one part.
+    """
+
+    def __init__(self, turns):
+        self.turns = list(turns)
+        self.sent = []
+
+    def send_message(self, content, stream=False):
+        self.sent.append(content)
+        return [types.SimpleNamespace(parts=[part]) for part in self.turns.pop(0)]
+
+    async def send_message_async(self, content, stream=False):
+        chunks = self.send_message(content, stream)
+
+        async def iterate():
+            for chunk in chunks:
+                await asyncio.sleep(0)
+                yield chunk
+
+        return iterate()
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    def use(turns, **tools):
+        chat = _Chat(turns)
+        monkeypatch.setattr(
+            main, "model", types.SimpleNamespace(start_chat=lambda: chat)
+        )
+        monkeypatch.setattr(main, "route", lambda prompt: None)
+        monkeypatch.setattr(main, "prompt_cache", PromptCache())
+        monkeypatch.setattr(main, "tools_by_name", tools)
+        return chat
+
+    return use
+
+
+def _collect_async(prompt):
+    async def collect():
+        return [event async for event in main.stream_agent_async(prompt)]
+
+    return asyncio.run(collect())
+
+
+def test_async_agent_awaits_the_model_and_runs_tools_off_the_loop(agent):
+    threads = []
+
+    def get_especialidades():
+        threads.append(threading.current_thread())
+        return {"data": {"especialidades": [{"id": "1"}]}}
+
+    chat = agent(
+        [[_part("Buscando. "), _call("get_especialidades")], [_part("Hay una.")]],
+        get_especialidades=get_especialidades,
+    )
+    events = _collect_async("¿cuántas especialidades hay?")
+
+    assert [event for event, _ in events] == [
+        "token",
+        "tool_start",
+        "tool_end",
+        "token",
+        "done",
+    ]
+    assert events[-1][1] == {"type": "text", "content": "Hay una."}
+    assert threads[0] is not threading.main_thread()
+    assert chat.sent[1][0].function_response.name == "get_especialidades"
+
+
+def test_tool_calls_of_one_turn_run_concurrently_and_answer_in_order(agent):
+    # Each tool waits for the other, so the test only passes if they overlap.
+    barrier = threading.Barrier(2, timeout=5)
+
+    def get_medicos():
+        barrier.wait()
+        time.sleep(0.05)
+        return {"data": {"medicos": []}}
+
+    def get_especialidades():
+        barrier.wait()
+        return {"data": {"especialidades": []}}
+
+    chat = agent(
+        [[_call("get_medicos"), _call("get_especialidades")], [_part("Nada.")]],
+        get_medicos=get_medicos,
+        get_especialidades=get_especialidades,
+    )
+    events = list(main.stream_agent("médicos y especialidades"))
+
+    finished = [data["name"] for event, data in events if event == "tool_end"]
+    assert finished == ["get_especialidades", "get_medicos"]
+    assert all(data["ok"] for event, data in events if event == "tool_end")
+    answered = [part.function_response.name for part in chat.sent[1]]
+    assert answered == ["get_medicos", "get_especialidades"]
+
+
+def _report_tool(path):
+    def generar_csv_tool(datos):
+        with open(path, "w", encoding="utf-8") as file:
+            file.write("id\n1\n")
+        return {
+            "type": "report",
+            "format": "csv",
+            "path": path,
+            "rows": 1,
+            "message": "CSV report generated successfully.",
+        }
+
+    return generar_csv_tool
+
+
+@pytest.mark.parametrize(
+    "run", [main.run_agent, lambda p: asyncio.run(main.run_agent_async(p))]
+)
+def test_agent_finishes_once_a_report_is_written(agent, tmp_path, run):
+    path = str(tmp_path / "citas.csv")
+    chat = agent(
+        [[_call("generar_csv_tool", datos=[{"id": 1}])]],
+        generar_csv_tool=_report_tool(path),
+    )
+    response = run("reporte csv de citas")
+
+    assert response == {"type": "report", "format": "csv", "path": path, "rows": 1}
+    # The model is not asked to restate the report.
+    assert len(chat.sent) == 1
+
+
+def test_agent_can_let_the_model_describe_the_report(agent, tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "AGENT_FINISH_ON_REPORT", False)
+    path = str(tmp_path / "citas.csv")
+    chat = agent(
+        [[_call("generar_csv_tool", datos=[{"id": 1}])], [_part("Reporte listo.")]],
+        generar_csv_tool=_report_tool(path),
+    )
+    response = main.run_agent("reporte csv de citas")
+
+    assert response["path"] == path
+    assert response["message"] == "Reporte listo."
+    assert len(chat.sent) == 2
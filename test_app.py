@@ -0,0 +1,102 @@
+import json
+import os
+
+# The agent module refuses to load without an API key; no model call is made.
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+
+import app  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from src.reporting import downloads  # noqa: E402
+from src.reporting.storage import ReportStorage  # noqa: E402
+
+
+def _events(body):
+    events = []
+    for frame in body.strip().split("\n\n"):
+        event, data = frame.split("\n")
+        events.append((event[len("event: ") :], json.loads(data[len("data: ") :])))
+    return events
+
+
+def test_stream_sends_events_with_links_without_touching_the_response(monkeypatch):
+    report = {"type": "report", "format": "csv", "path": "reports/x.csv", "rows": 1}
+
+    async def stream_agent_async(prompt):
+        yield "token", {"text": "Listo"}
+        yield "report", report
+        yield "done", report
+
+    monkeypatch.setattr(app, "stream_agent_async", stream_agent_async)
+    response = TestClient(app.app).post("/ask_agent/stream", json={"prompt": "x"})
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _events(response.text)
+    assert [event for event, _ in events] == ["token", "report", "done"]
+    assert events[2][1]["download_url"].endswith("/reports/x.csv")
+    # The agent's dict, which the prompt cache may hold, gets no URL.
+    assert "download_url" not in report
+
+
+def test_shutdown_releases_the_client_and_report_workers(monkeypatch):
+    closed = []
+    monkeypatch.setattr(app, "close_client", lambda: closed.append("client"))
+    monkeypatch.setattr(app.report_jobs, "shutdown", lambda: closed.append("jobs"))
+    monkeypatch.setattr(app.report_storage, "close", lambda: closed.append("storage"))
+    with TestClient(app.app) as client:
+        assert client.get("/").status_code == 200
+        assert closed == []
+    assert closed == ["client", "jobs", "storage"]
+
+
+def _serve_reports_from(directory, monkeypatch):
+    storage = ReportStorage(directory=str(directory))
+    monkeypatch.setattr(app, "report_storage", storage)
+    monkeypatch.setattr(downloads, "report_storage", storage)
+    monkeypatch.setattr(
+        app,
+        "safe_report_path",
+        lambda filename: downloads.safe_report_path(filename, str(directory)),
+    )
+    return storage
+
+
+def test_report_downloads_revalidate_and_resume(tmp_path, monkeypatch):
+    _serve_reports_from(tmp_path, monkeypatch)
+    (tmp_path / "reporte.pdf").write_bytes(b"%PDF-" + bytes(range(256)) * 8)
+    client = TestClient(app.app)
+
+    response = client.get("/reports/reporte.pdf")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+
+    response = client.get("/reports/reporte.pdf", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    response = client.get("/reports/reporte.pdf", headers={"Range": "bytes=5-9"})
+    assert response.status_code == 206
+    assert response.content == bytes(range(5))
+    assert response.headers["etag"] == etag
+
+    assert client.get("/reports/..%2Fapp.py").status_code == 404
+
+
+def test_text_reports_are_served_from_a_gzip_copy(tmp_path, monkeypatch):
+    storage = _serve_reports_from(tmp_path, monkeypatch)
+    path = tmp_path / "reporte.csv"
+    body = "id,paciente\n" + "".join(f"{i},paciente{i}\n" for i in range(500))
+    path.write_text(body, encoding="utf-8")
+    storage.add(str(path))
+    client = TestClient(app.app)
+
+    response = client.get("/reports/reporte.csv", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.text == body
+    assert (tmp_path / "reporte.csv.gz").exists()
+    assert storage.get("reporte.csv")["variants"] == ["reporte.csv.gz"]
+
+    response = client.get(
+        "/reports/reporte.csv", headers={"Accept-Encoding": "identity"}
+    )
+    assert "content-encoding" not in response.headers
+    assert response.text == body
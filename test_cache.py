@@ -0,0 +1,58 @@
+import time
+
+from src.graphql_client.cache import ResponseCache
+from src.graphql_client.client import GraphQLClient
+
+
+def test_response_cache_expires_entries():
+    cache = ResponseCache()
+    cache.set("k", {"data": 1}, ttl=0.05)
+    assert cache.get("k") == {"data": 1}
+    time.sleep(0.06)
+    assert cache.get("k") is None
+
+
+def test_response_cache_evicts_least_recently_used():
+    cache = ResponseCache(max_entries=2)
+    cache.set("a", 1, ttl=60)
+    cache.set("b", 2, ttl=60)
+    cache.get("a")
+    cache.set("c", 3, ttl=60)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+    cache = ResponseCache(max_bytes=10)
+    cache.set("a", "xxxx", ttl=60)
+    cache.set("b", "yyyy", ttl=60)
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] <= 10
+
+
+def test_response_cache_returns_copies_and_invalidates_by_operation():
+    cache = ResponseCache()
+    cache.set("a", {"rows": [1]}, ttl=60, operation="GetMedicos")
+    cache.set("b", {"rows": [2]}, ttl=60, operation="GetEspecialidades")
+    cache.get("a")["rows"].append(9)
+    assert cache.get("a") == {"rows": [1]}
+    assert cache.invalidate("GetMedicos") == 1
+    assert cache.get("a") is None and cache.get("b") is not None
+
+
+def test_client_answers_repeated_queries_from_the_cache():
+    client = GraphQLClient(
+        endpoint="http://127.0.0.1:9/graphql",
+        cache=ResponseCache(),
+        persisted_queries=False,
+    )
+    sent = []
+
+    def post(payload, idempotent=True):
+        sent.append(payload)
+        return {"data": {"especialidades": [{"id": "1"}]}}
+
+    client._post = post
+    query = "query { especialidades { id } }"
+    first = client.execute(query, cache_ttl=60)
+    assert client.execute(query, cache_ttl=60) == first
+    client.execute(query)
+    assert len(sent) == 2
@@ -0,0 +1,92 @@
+import csv
+import json
+
+import openpyxl
+import pytest
+from pypdf import PdfReader
+
+from src.reporting import generator
+
+
+def _rows(count):
+    return [{"id": i, "paciente": f"paciente{i}"} for i in range(count)]
+
+
+def _pdf_text(path):
+    return [page.extract_text() for page in PdfReader(path).pages]
+
+
+def test_parallel_pdf_merges_chunks_in_order(tmp_path, monkeypatch):
+    monkeypatch.setattr(generator, "PDF_ROWS_PER_CHUNK", 50)
+    monkeypatch.setattr(generator, "PDF_WORKERS", 2)
+    datos = _rows(300)
+    serial = tmp_path / "serial.pdf"
+    parallel = tmp_path / "parallel.pdf"
+
+    generator.generar_pdf(datos, str(serial), paralelo=False)
+    generator.generar_pdf(datos, str(parallel), paralelo=True)
+
+    pages = _pdf_text(str(parallel))
+    assert len(pages) == len(_pdf_text(str(serial)))
+    text = "\n".join(pages)
+    positions = [text.index(f"paciente{i}\n") for i in (0, 150, 299)]
+    assert positions == sorted(positions)
+
+
+def test_pdf_repeats_the_header_on_every_page(tmp_path):
+    path = str(tmp_path / "reporte.pdf")
+    datos = _rows(500)
+    generator.generar_pdf(datos, path, paralelo=False)
+
+    pages = _pdf_text(path)
+    assert len(pages) > 1
+    assert all(page.startswith("id\npaciente\n") for page in pages)
+    text = "\n".join(pages)
+    assert all(f"paciente{i}\n" in text for i in range(len(datos)))
+
+
+def test_excel_continues_on_new_sheets(tmp_path, monkeypatch):
+    monkeypatch.setattr(generator, "EXCEL_MAX_ROWS", 4)
+    path = str(tmp_path / "reporte.xlsx")
+    generator.generar_excel(iter(_rows(7)), path)
+
+    wb = openpyxl.load_workbook(path)
+    assert wb.sheetnames == ["Reporte", "Reporte (2)", "Reporte (3)"]
+    sheets = [list(ws.values) for ws in wb.worksheets]
+    assert all(rows[0] == ("id", "paciente") for rows in sheets)
+    assert [row[0] for rows in sheets for row in rows[1:]] == list(range(7))
+
+
+def test_csv_and_jsonl_stream_every_row(tmp_path, monkeypatch):
+    monkeypatch.setattr(generator, "EXPORT_BATCH_ROWS", 3)
+    datos = _rows(7)
+    datos[0]["paciente"] = "Núñez, José"
+    csv_path = str(tmp_path / "reporte.csv")
+    jsonl_path = str(tmp_path / "reporte.jsonl")
+    progress = []
+
+    generator.generar_csv(datos, csv_path, progreso=progress.append)
+    generator.generar_jsonl(iter(datos), jsonl_path)
+
+    with open(csv_path, newline="", encoding="utf-8") as file:
+        rows = list(csv.DictReader(file))
+    assert rows == [{k: str(v) for k, v in d.items()} for d in datos]
+    with open(jsonl_path, encoding="utf-8") as file:
+        assert [json.loads(line) for line in file] == datos
+    assert progress[-1] == 1.0
+    assert progress == sorted(progress)
+
+
+@pytest.mark.skipif(not generator.PARQUET_DISPONIBLE, reason="pyarrow is not installed")
+def test_parquet_writes_row_groups(tmp_path, monkeypatch):
+    import pyarrow.parquet as pq
+
+    monkeypatch.setattr(generator, "EXPORT_BATCH_ROWS", 3)
+    datos = [dict(row, nota=None) for row in _rows(7)]
+    path = str(tmp_path / "reporte.parquet")
+    generator.generar_parquet(iter(datos), path)
+
+    parquet = pq.ParquetFile(path)
+    assert parquet.metadata.num_row_groups == 3
+    assert parquet.schema_arrow.field("nota").type == "string"
+    assert parquet.read().to_pylist() == datos
@@ -0,0 +1,159 @@
+import threading
+import time
+
+import pytest
+
+from src.graphql_client.batching import QueryBatcher, merge_queries, split_batch_result
+from src.graphql_client.client import GraphQLClient, close_client, get_client
+from src.graphql_client.errors import DeadlineExceededError, GraphQLHTTPError
+from src.graphql_client.operations import register_operation
+from src.graphql_client.resilience import deadline, remaining_time
+
+QUERY = register_operation("query PruebaPersistida { especialidades { id } }")
+
+
+def _client(responses):
+    client = GraphQLClient(
+        endpoint="http://127.0.0.1:9/graphql", persisted_queries=True
+    )
+    payloads = []
+
+    def post(payload, idempotent=True):
+        payloads.append(payload)
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    client._post = post
+    return client, payloads
+
+
+def test_persisted_query_sends_only_the_hash():
+    ok = {"data": {"especialidades": []}}
+    client, payloads = _client([ok])
+    assert client.execute(QUERY) == ok
+    assert "query" not in payloads[0]
+
+
+def test_unknown_hash_is_retried_with_the_document():
+    not_found = {"errors": [{"extensions": {"code": "PERSISTED_QUERY_NOT_FOUND"}}]}
+    ok = {"data": {"especialidades": []}}
+    client, payloads = _client([not_found, ok])
+    assert client.execute(QUERY) == ok
+    assert payloads[1]["query"] == QUERY
+    assert client.persisted_queries
+
+
+def test_ordinary_errors_do_not_disable_persisted_queries():
+    denied = {"errors": [{"message": "Unauthorized"}], "data": None}
+    client, payloads = _client([denied])
+    assert client.execute(QUERY) == denied
+    assert len(payloads) == 1
+    assert client.persisted_queries
+
+
+def test_unsupported_persisted_queries_are_turned_off():
+    unsupported = {
+        "errors": [{"extensions": {"code": "PERSISTED_QUERY_NOT_SUPPORTED"}}]
+    }
+    ok = {"data": {"especialidades": []}}
+    client, payloads = _client([unsupported, ok])
+    assert client.execute(QUERY) == ok
+    assert not client.persisted_queries
+
+
+def test_http_client_error_turns_persisted_queries_off():
+    ok = {"data": {"especialidades": []}}
+    client, payloads = _client([GraphQLHTTPError("Bad Request", 400), ok])
+    assert client.execute(QUERY) == ok
+    assert payloads[1]["query"] == QUERY
+    assert not client.persisted_queries
+
+
+def test_retryable_http_error_is_not_resent_with_the_document():
+    client, payloads = _client([GraphQLHTTPError("Service Unavailable", 503)])
+    with pytest.raises(GraphQLHTTPError):
+        client.execute(QUERY)
+    assert len(payloads) == 1
+    assert client.persisted_queries
+
+
+def test_merge_queries_aliases_fields_and_variables():
+    document, variables, aliases = merge_queries(
+        [
+            ("query A($id: ID!) { usuario(id: $id) { id } }", {"id": "1"}),
+            ("query B($id: ID!) { usuario(id: $id) { id } }", {"id": "2"}),
+        ]
+    )
+    assert "b0_usuario: usuario(id: $b0_id)" in document
+    assert "b1_usuario: usuario(id: $b1_id)" in document
+    assert variables == {"b0_id": "1", "b1_id": "2"}
+    assert aliases == [{"b0_usuario": "usuario"}, {"b1_usuario": "usuario"}]
+
+
+def test_split_batch_result_routes_data_and_errors():
+    aliases = [{"b0_citas": "citas"}, {"b1_medicos": "medicos"}]
+    result = {
+        "data": {"b0_citas": [{"id": 1}], "b1_medicos": None},
+        "errors": [{"message": "boom", "path": ["b1_medicos", 0]}],
+    }
+    first, second = split_batch_result(result, aliases)
+    assert first == {"data": {"citas": [{"id": 1}]}}
+    assert second["data"] == {"medicos": None}
+    assert second["errors"][0]["path"] == ["medicos", 0]
+
+
+def test_invalid_query_does_not_fail_the_whole_batch():
+    client = GraphQLClient(
+        endpoint="http://127.0.0.1:9/graphql", persisted_queries=False
+    )
+    sent = []
+
+    def post(payload, idempotent=True):
+        sent.append(payload["query"])
+        if "noExiste" in payload["query"]:
+            return {"errors": [{"message": "Cannot query field 'noExiste'"}]}
+        return {"data": {"especialidades": []}}
+
+    client._post = post
+    good, bad = client.execute_many(
+        [("{ especialidades { id } }", None), ("{ noExiste }", None)]
+    )
+    assert good == {"data": {"especialidades": []}}
+    assert "errors" in bad
+    assert len(sent) == 3
+
+
+def test_batches_run_under_their_callers_deadline():
+    seen = []
+
+    class Client:
+        def execute_many(self, queries):
+            seen.append(remaining_time())
+            return [{"data": {}} for _ in queries]
+
+    batcher = QueryBatcher(Client(), window=0.001)
+    with deadline(5):
+        assert batcher.execute("{ especialidades { id } }") == {"data": {}}
+    assert seen[0] is not None and 0 < seen[0] <= 5
+
+
+def test_batcher_stops_waiting_at_the_deadline():
+    class Client:
+        def execute_many(self, queries):
+            time.sleep(0.3)
+            return [{"data": {}} for _ in queries]
+
+    batcher = QueryBatcher(Client(), window=0.001)
+    with deadline(0.05):
+        with pytest.raises(DeadlineExceededError):
+            batcher.execute("{ especialidades { id } }")
+
+
+def test_tools_share_one_client_until_it_is_closed():
+    client = get_client()
+    assert get_client() is client
+    close_client()
+    assert get_client() is not client
+    close_client()
@@ -0,0 +1,54 @@
+import time
+import types
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from src.reporting import jobs
+from src.reporting.jobs import ReportJobQueue
+from src.reporting.storage import ReportStorage
+
+
+class _BrokenPool:
+    def submit(self, *args, **kwargs):
+        raise BrokenProcessPool("A worker was killed")
+
+    def shutdown(self, wait=True):
+        pass
+
+
+def _queue(pool):
+    queue = ReportJobQueue(max_workers=1, max_pending=1)
+    queue._manager = types.SimpleNamespace(shutdown=lambda: None)
+    queue._progress = {}
+    queue._pool = pool
+    return queue
+
+
+def test_failed_submit_does_not_leak_a_pending_job():
+    class FailingPool(_BrokenPool):
+        def submit(self, *args, **kwargs):
+            raise RuntimeError("cannot schedule new futures after shutdown")
+
+    queue = _queue(FailingPool())
+    with pytest.raises(RuntimeError):
+        queue.submit("csv", [{"a": 1}], "x.csv")
+    assert queue._pending == 0
+    assert not queue._jobs
+    assert not queue._progress
+
+
+def test_broken_pool_is_replaced(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "report_storage", ReportStorage(str(tmp_path)))
+    queue = _queue(_BrokenPool())
+    path = str(tmp_path / "x.csv")
+    try:
+        job = queue.submit("csv", [{"a": 1}], path)
+        for _ in range(600):
+            if queue.status(job.id)["status"] in ("done", "failed"):
+                break
+            time.sleep(0.05)
+        assert queue.status(job.id)["status"] == "done"
+        assert open(path, encoding="utf-8").read().splitlines() == ["a", "1"]
+    finally:
+        queue.shutdown()
@@ -0,0 +1,35 @@
+import time
+
+from src.agent.prompt_cache import PromptCache, key_terms, normalize_prompt
+
+
+def test_normalize_prompt_ignores_case_accents_and_punctuation():
+    assert normalize_prompt("  ¿Médicos   DISPONIBLES? ") == "medicos disponibles"
+    assert key_terms(normalize_prompt("dame las especialidades")) == {"especialidad"}
+
+
+def test_prompt_cache_reuses_similar_prompts_with_same_key_terms():
+    cache = PromptCache()
+    cache.set("lista de especialidades", {"type": "text", "content": "x"}, ttl=60)
+    assert cache.get("Lista de especialidades.") == {"type": "text", "content": "x"}
+    assert cache.get("listado de especialidades médicas") is not None
+    assert cache.get("lista de médicos") is None
+
+
+def test_prompt_cache_expires_and_evicts():
+    cache = PromptCache(max_entries=1)
+    cache.set("lista de especialidades", {"content": 1}, ttl=0.05)
+    time.sleep(0.06)
+    assert cache.get("lista de especialidades") is None
+
+    cache.set("lista de especialidades", {"content": 1}, ttl=60)
+    cache.set("lista de medicos", {"content": 2}, ttl=60)
+    assert cache.get("lista de especialidades") is None
+    assert cache.stats()["entries"] == 1
+
+
+def test_prompt_cache_returns_copies():
+    cache = PromptCache()
+    cache.set("lista de especialidades", {"rows": [1]}, ttl=60)
+    cache.get("lista de especialidades")["rows"].append(2)
+    assert cache.get("lista de especialidades") == {"rows": [1]}
@@ -0,0 +1,30 @@
+from src.agent.tools import generar_csv_tool
+from src.reporting.cache import ReportCache, report_key
+from src.reporting.storage import ReportStorage
+
+
+def test_identical_reports_are_rendered_once(tmp_path):
+    cache = ReportCache(ReportStorage(directory=str(tmp_path)))
+    calls = []
+
+    def generator(datos, nombre_archivo):
+        calls.append(nombre_archivo)
+        with open(nombre_archivo, "w", encoding="utf-8") as file:
+            file.write("id\n1\n")
+
+    datos = [{"id": 1}]
+    key = report_key("csv", datos)
+    assert cache.get(key, "csv") is None
+    path = cache.render(key, "csv", generator, datos)
+    assert cache.get(key, "csv") == path
+    assert len(calls) == 1
+    assert report_key("csv", [{"id": 2}]) != key
+    assert cache.stats() == {"hits": 1, "misses": 1}
+
+
+def test_reports_without_rows_are_rejected():
+    result = generar_csv_tool(datos=[])
+    assert "no rows" in result["error"]
+
+    result = generar_csv_tool(datos=[{"estado": "ACTIVA"}], filtros=["estado=BAJA"])
+    assert "no rows" in result["error"]
@@ -0,0 +1,67 @@
+import time
+
+import pytest
+
+from src.graphql_client.client import GraphQLClient
+from src.graphql_client.errors import CircuitOpenError, DeadlineExceededError
+from src.graphql_client.resilience import CircuitBreaker, RetryPolicy, deadline
+
+
+def _open_breaker(breaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.before_call()
+        breaker.record_failure()
+
+
+def test_breaker_opens_after_threshold_and_rejects_calls():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    _open_breaker(breaker)
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_breaker_lets_one_trial_through_when_half_open():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    _open_breaker(breaker)
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+
+
+def test_failed_trial_opens_breaker_again():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    _open_breaker(breaker)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_released_trial_frees_the_slot():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    _open_breaker(breaker)
+    breaker.before_call()
+    breaker.release()
+    breaker.before_call()
+
+
+def test_exhausted_deadline_does_not_lock_half_open_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    _open_breaker(breaker)
+    client = GraphQLClient(
+        endpoint="http://127.0.0.1:9/graphql",
+        breaker=breaker,
+        retry=RetryPolicy(max_attempts=1),
+        persisted_queries=False,
+    )
+    with deadline(0):
+        time.sleep(0.001)
+        with pytest.raises(DeadlineExceededError):
+            client.execute("query { especialidades { id } }")
+    # The trial slot is still free, so the next call reaches the breaker.
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
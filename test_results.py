@@ -0,0 +1,119 @@
+import csv
+
+import openpyxl
+import pytest
+
+from src.agent.results import (
+    ResultStore,
+    flatten_row,
+    result_store,
+    select_rows,
+    shape_rows,
+)
+from src.reporting.generator import generar_csv, generar_excel, generar_pdf
+
+USUARIOS = [
+    {"id": 1, "username": "ana", "roles": [{"id": "1", "nombre": "ADMIN"}]},
+    {"id": 2, "username": "luis", "roles": []},
+    {"id": 3, "username": "eva", "medico": None},
+]
+
+
+def test_flatten_row_uses_dotted_keys_and_joins_lists():
+    row = {
+        "id": 1,
+        "paciente": {"username": "ana", "perfil": {"edad": 30}},
+        "roles": [{"nombre": "ADMIN"}, {"nombre": "MEDICO"}],
+        "tags": ["a", "b"],
+    }
+    assert flatten_row(row) == {
+        "id": 1,
+        "paciente.username": "ana",
+        "paciente.perfil.edad": 30,
+        "roles.nombre": "ADMIN, MEDICO",
+        "tags": "a, b",
+    }
+
+
+def test_select_rows_filters_sorts_and_projects():
+    rows = [
+        {"id": 1, "fecha": "2025-01-03", "nombre": "Ana"},
+        {"id": 2, "fecha": "2024-12-30", "nombre": "Luis"},
+        {"id": 3, "fecha": "2025-02-01", "nombre": "Eva"},
+    ]
+    selected = select_rows(
+        rows, filtros=["fecha>=2025-01-01"], ordenar_por="-id", columnas=["nombre"]
+    )
+    assert selected == [{"nombre": "Eva"}, {"nombre": "Ana"}]
+
+
+def test_select_rows_rejects_unknown_columns():
+    with pytest.raises(ValueError):
+        select_rows([{"id": 1}], filtros=["edad>3"])
+    with pytest.raises(ValueError):
+        select_rows([{"id": 1}], columnas=["edad"])
+
+
+def test_select_rows_gives_every_row_the_same_columns():
+    rows = [flatten_row(row) for row in USUARIOS]
+    selected = select_rows(rows)
+    columns = list(selected[0])
+    assert columns == ["id", "username", "roles.id", "roles.nombre", "roles", "medico"]
+    assert all(list(row) == columns for row in selected)
+    assert selected[1]["roles.id"] is None
+
+
+def test_shape_rows_truncates_and_summarizes():
+    rows = [{"id": i, "nombre": f"n{i}"} for i in range(10)]
+    shaped = shape_rows(rows, max_rows=3)
+    assert shaped["total_rows"] == 10
+    assert shaped["columns"] == ["id", "nombre"]
+    assert shaped["rows"] == [[0, "n0"], [1, "n1"], [2, "n2"]]
+    assert shaped["truncated"]
+    assert shaped["summary"]["id"] == {"min": 0, "max": 9, "mean": 4.5}
+    assert len(result_store.get(shaped["handle"])) == 10
+
+
+def test_shape_rows_does_not_store_results_returned_in_full():
+    shaped = shape_rows([{"id": 1}], max_rows=3)
+    assert not shaped["truncated"]
+    assert "handle" not in shaped
+
+
+def test_shape_rows_drops_rows_past_the_token_budget():
+    rows = [{"id": i, "texto": "x" * 100} for i in range(20)]
+    shaped = shape_rows(rows, max_rows=20, max_tokens=200)
+    assert 0 < len(shaped["rows"]) < 20
+    assert shaped["truncated"]
+
+
+def test_result_store_evicts_to_fit_its_byte_budget():
+    store = ResultStore(max_bytes=40)
+    first = store.put([{"a": "x" * 10}])
+    second = store.put([{"a": "y" * 10}])
+    with pytest.raises(LookupError):
+        store.get(first)
+    assert store.get(second) == [{"a": "y" * 10}]
+    assert store.put([{"a": "z" * 100}]) is None
+
+
+def test_reports_write_values_under_their_own_headers(tmp_path):
+    rows = select_rows([flatten_row(row) for row in USUARIOS])
+
+    excel = tmp_path / "usuarios.xlsx"
+    generar_excel(rows, str(excel))
+    sheet = openpyxl.load_workbook(excel).active
+    values = [list(row) for row in sheet.iter_rows(values_only=True)]
+    assert values[0] == list(rows[0])
+    assert values[1][:4] == [1, "ana", "1", "ADMIN"]
+    assert values[2][:4] == [2, "luis", None, None]
+
+    path = tmp_path / "usuarios.csv"
+    generar_csv(rows, str(path))
+    with open(path, encoding="utf-8") as file:
+        written = list(csv.DictReader(file))
+    assert written[0]["roles.nombre"] == "ADMIN"
+    assert written[1]["roles.nombre"] == ""
+
+    # Later rows with fewer keys used to break the column widths.
+    generar_pdf([{"a": 1, "b": 2}, {"a": 3}], str(tmp_path / "parcial.pdf"))
@@ -0,0 +1,38 @@
+from src.agent import router
+from src.agent.router import format_result, match_route
+from src.agent.tools import get_citas_por_medico, get_especialidades
+
+
+def test_match_route_finds_simple_lookups():
+    tool, kwargs, _ = match_route("Lista de especialidades médicas")
+    assert tool is get_especialidades and kwargs == {}
+
+    tool, kwargs, _ = match_route("Muéstrame las citas del doctor con id 5")
+    assert tool is get_citas_por_medico and kwargs == {"medico_id": "5"}
+
+
+def test_match_route_leaves_anything_else_to_the_model():
+    assert match_route("citas del médico 5 en enero") is None
+    assert match_route("citas del médico 5 y 6") is None
+    assert match_route("genera un pdf de especialidades") is None
+
+
+def test_route_answers_with_a_table_without_the_model(monkeypatch):
+    def get_especialidades():
+        return {"data": {"especialidades": [{"id": "1", "nombre": "Cardio|logía"}]}}
+
+    monkeypatch.setitem(
+        router.ROUTES,
+        frozenset({"especialidad"}),
+        (get_especialidades, None, "especialidades"),
+    )
+    response, tool_name = router.route("lista de especialidades")
+    assert tool_name == "get_especialidades"
+    assert response["type"] == "text"
+    assert "Se encontraron 1 especialidades:" in response["content"]
+    assert "| 1 | Cardio\\|logía |" in response["content"]
+
+
+def test_errors_are_left_to_the_model():
+    assert format_result({"error": "boom"}, "especialidades") is None
+    assert format_result({"errors": [{"message": "x"}]}, "especialidades") is None
@@ -0,0 +1,51 @@
+import re
+
+import pytest
+
+from src.agent import tools
+from src.graphql_client.selection import project_query
+
+
+def test_project_query_keeps_only_the_requested_fields():
+    projected = project_query(
+        tools.GET_CITAS_POR_MEDICO_QUERY, ["fecha", "usuario.username"]
+    )
+    assert "citasPorMedico(medicoId:$medicoId){fecha usuario{username}}" in projected
+    assert "especialidad" not in projected
+
+
+def test_naming_an_object_field_selects_its_scalar_subfields():
+    projected = project_query(tools.GET_HORARIOS_DISPONIBLES_QUERY, ["turno"])
+    assert "{turno{nombre}}" in projected
+
+
+def test_unknown_fields_are_rejected_with_the_available_ones():
+    with pytest.raises(ValueError, match="Available fields: id, username"):
+        project_query(tools.GET_USUARIOS_QUERY, ["paciente.username"])
+
+
+@pytest.mark.parametrize(
+    "tool, query",
+    [
+        (tools.get_usuarios, tools.GET_USUARIOS_QUERY),
+        (tools.get_medicos, tools.GET_MEDICOS_QUERY),
+        (
+            tools.get_usuarios_por_especialidad,
+            tools.GET_USUARIOS_POR_ESPECIALIDAD_QUERY,
+        ),
+        (tools.get_citas, tools.GET_CITAS_QUERY),
+        (tools.get_citas_por_usuario, tools.GET_CITAS_POR_USUARIO_QUERY),
+        (tools.get_citas_por_medico, tools.GET_CITAS_POR_MEDICO_QUERY),
+        (
+            tools.get_diagnosticos_por_paciente,
+            tools.GET_DIAGNOSTICOS_POR_PACIENTE_QUERY,
+        ),
+        (tools.get_triajes_por_paciente, tools.GET_TRIAJES_POR_PACIENTE_QUERY),
+        (tools.get_horarios_disponibles, tools.GET_HORARIOS_DISPONIBLES_QUERY),
+    ],
+)
+def test_documented_fields_can_be_projected(tool, query):
+    documented = re.search(r"to keep the result small: (.*?)\. All", tool.__doc__)
+    fields = re.findall(r'"([\w.]+)"', documented.group(1))
+    assert fields
+    project_query(query, fields)
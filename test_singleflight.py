@@ -0,0 +1,62 @@
+import threading
+import time
+
+import pytest
+
+from src.graphql_client.errors import DeadlineExceededError
+from src.graphql_client.resilience import deadline
+from src.graphql_client.singleflight import SingleFlight
+
+
+def test_single_flight_shares_one_call_between_concurrent_callers():
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def fetch():
+        calls.append(1)
+        release.wait(1)
+        return {"data": {"items": [1]}}
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(flight.do("k", fetch)))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert results == [{"data": {"items": [1]}}] * 5
+    # Every caller got its own copy.
+    results[0]["data"]["items"].append(2)
+    assert results[1]["data"]["items"] == [1]
+
+
+def test_single_flight_shares_errors_and_forgets_finished_calls():
+    flight = SingleFlight()
+
+    def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        flight.do("k", fail)
+    assert flight.do("k", lambda: 1) == 1
+
+
+def test_single_flight_follower_stops_waiting_at_its_deadline():
+    flight = SingleFlight()
+    release = threading.Event()
+    leader = threading.Thread(target=lambda: flight.do("k", lambda: release.wait(1)))
+    leader.start()
+    time.sleep(0.05)
+    try:
+        with deadline(0.05):
+            with pytest.raises(DeadlineExceededError):
+                flight.do("k", lambda: None)
+    finally:
+        release.set()
+        leader.join()
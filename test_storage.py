@@ -0,0 +1,83 @@
+import os
+
+from src.reporting.downloads import safe_report_path
+from src.reporting.storage import ReportStorage, is_safe_report_name
+
+
+def test_unique_path_returns_downloadable_names(tmp_path):
+    storage = ReportStorage(directory=str(tmp_path))
+    path = storage.unique_path("Reporte de citas.pdf")
+    assert os.path.basename(path) == "Reporte_de_citas.pdf"
+    open(path, "wb").close()
+    assert safe_report_path(os.path.basename(path), str(tmp_path)) == os.path.realpath(
+        path
+    )
+
+    for name in ("../../etc/passwd", ".oculto.csv", "x.ab12cd34.tmp.pdf", "a..pdf"):
+        assert is_safe_report_name(os.path.basename(storage.unique_path(name)))
+
+
+def test_unique_path_does_not_reuse_taken_names(tmp_path):
+    storage = ReportStorage(directory=str(tmp_path))
+    first = storage.unique_path("reporte.csv")
+    second = storage.unique_path("reporte.csv")
+    assert first != second
+    assert second.endswith(".csv")
+
+
+def test_safe_report_path_rejects_temporary_and_hidden_files(tmp_path):
+    for name in ("x.ab12cd34.tmp.pdf", ".index.json", "ok.pdf"):
+        open(tmp_path / name, "wb").close()
+    assert safe_report_path("x.ab12cd34.tmp.pdf", str(tmp_path)) is None
+    assert safe_report_path(".index.json", str(tmp_path)) is None
+    assert safe_report_path("../ok.pdf", str(tmp_path)) is None
+    assert safe_report_path("ok.pdf", str(tmp_path)) is not None
+
+
+def test_stale_index_is_reconciled_with_the_directory(tmp_path):
+    storage = ReportStorage(directory=str(tmp_path), max_bytes=10)
+    indexed = storage.unique_path("indexado.csv")
+    with open(indexed, "wb") as file:
+        file.write(b"12345")
+    storage.add(indexed)
+    storage.save()
+    storage.close()
+
+    # Written after the last save, as if the server had crashed.
+    with open(tmp_path / "perdido.csv", "wb") as file:
+        file.write(b"1234567890")
+    os.remove(indexed)
+
+    storage = ReportStorage(directory=str(tmp_path), max_bytes=10)
+    assert [entry["name"] for entry in storage.list()] == ["perdido.csv"]
+    assert storage.get("perdido.csv")["size"] == 10
+    storage.save()
+    assert storage.get("perdido.csv") is not None
+    storage.close()
+
+
+def test_processes_sharing_the_directory_merge_their_indexes(tmp_path):
+    first = ReportStorage(directory=str(tmp_path))
+    second = ReportStorage(directory=str(tmp_path))
+    assert first.list() == second.list() == []
+
+    path = first.unique_path("otro_proceso.csv")
+    with open(path, "wb") as file:
+        file.write(b"12345")
+    first.add(path)
+    first.save()
+    second.save()
+    assert second.get("otro_proceso.csv")["size"] == 5
+
+    second.touch(path, downloaded=True)
+    second.save()
+    first.save()
+    assert first.get("otro_proceso.csv")["last_downloaded"] is not None
+
+    first.max_age = 0
+    assert first.cleanup() == ["otro_proceso.csv"]
+    first.save()
+    second.save()
+    assert second.get("otro_proceso.csv") is None
+    first.close()
+    second.close()
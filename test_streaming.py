@@ -0,0 +1,34 @@
+import json
+
+import pytest
+
+from src.graphql_client.errors import GraphQLClientError
+from src.graphql_client.streaming import iter_json_array
+
+
+def _chunks(document, size):
+    body = json.dumps(document).encode("utf-8")
+    return [body[i : i + size] for i in range(0, len(body), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 4, 5, 7, 64])
+def test_items_survive_any_chunk_boundary(size):
+    citas = [4.5, 7, -12e3, True, None, "ñandú", {"id": 1, "tags": [1, 2]}, [3]]
+    document = {"data": {"citas": citas}}
+    assert list(iter_json_array(_chunks(document, size), "citas")) == citas
+
+
+def test_null_list_yields_nothing():
+    assert list(iter_json_array(_chunks({"data": {"citas": None}}, 3), "citas")) == []
+
+
+def test_truncated_list_raises():
+    body = b'{"data": {"citas": [1, 2, 3'
+    with pytest.raises(GraphQLClientError):
+        list(iter_json_array([body], "citas"))
+
+
+def test_graphql_errors_are_raised():
+    document = {"errors": [{"message": "Unauthorized"}], "data": None}
+    with pytest.raises(GraphQLClientError, match="Unauthorized"):
+        list(iter_json_array(_chunks(document, 4), "citas"))
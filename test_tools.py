@@ -0,0 +1,121 @@
+import pytest
+
+from src.agent import tools
+from src.graphql_client.errors import GraphQLClientError
+from src.graphql_client.pagination import paginate_cursor, paginate_offset
+
+UNKNOWN_LIMIT = 'Unknown argument "limit" on field "Query.citas".'
+
+
+class _PagedClient:
+    def __init__(self, rows):
+        self.rows = rows
+        self.offsets = []
+
+    def execute(self, query, variables=None, cache_ttl=None):
+        offset, limit = variables["offset"], variables["limit"]
+        self.offsets.append(offset)
+        return {"data": {"citas": self.rows[offset : offset + limit]}}
+
+
+def test_paginate_offset_reads_every_page_and_stops_at_a_short_one():
+    client = _PagedClient([{"id": i} for i in range(7)])
+    rows = list(paginate_offset(client, "q", "citas", page_size=3, prefetch=2))
+    assert rows == [{"id": i} for i in range(7)]
+    assert sorted(client.offsets)[:3] == [0, 3, 6]
+
+
+def test_paginate_cursor_follows_end_cursors():
+    pages = {
+        None: {"nodes": [1, 2], "pageInfo": {"hasNextPage": True, "endCursor": "b"}},
+        "b": {"edges": [{"node": 3}], "pageInfo": {"hasNextPage": False}},
+    }
+
+    class Client:
+        def execute(self, query, variables=None, cache_ttl=None):
+            return {"data": {"citas": pages[variables["after"]]}}
+
+    assert list(paginate_cursor(Client(), "q", "citas", page_size=2)) == [1, 2, 3]
+
+
+def test_page_errors_are_raised():
+    class Client:
+        def execute(self, query, variables=None, cache_ttl=None):
+            return {"errors": [{"message": "boom"}], "data": None}
+
+    with pytest.raises(GraphQLClientError, match="boom"):
+        list(paginate_offset(Client(), "q", "citas"))
+
+
+def test_whole_lists_are_read_page_by_page(monkeypatch):
+    client = _PagedClient([{"id": i} for i in range(5)])
+    client.paginate = lambda *args, **kwargs: paginate_offset(
+        client, *args[:3], page_size=2, prefetch=kwargs["prefetch"]
+    )
+    monkeypatch.setattr(tools, "get_client", lambda: client)
+    monkeypatch.setattr(tools, "_unpaginated_fields", set())
+    assert tools.get_citas() == {"data": {"citas": [{"id": i} for i in range(5)]}}
+
+
+def test_fields_without_pagination_are_detected_one_by_one(monkeypatch):
+    queries = []
+
+    def execute(query, variables=None):
+        queries.append(query)
+        if "$limit" in query and "citas(" in query:
+            return {"errors": [{"message": UNKNOWN_LIMIT}], "data": None}
+        return {"data": {"citas": [{"id": 1}], "usuarios": [{"id": 2}]}}
+
+    monkeypatch.setattr(tools, "execute_graphql_query", execute)
+    monkeypatch.setattr(tools, "_unpaginated_fields", set())
+
+    # A page is never cut from the whole list behind the model's back.
+    assert "without limit" in tools.get_citas(limit=2, page=2)["error"]
+    assert tools._unpaginated_fields == {"citas"}
+    queries.clear()
+    assert "error" in tools.get_citas(limit=2)
+    assert queries == []
+
+    # Other fields still ask the backend for one page.
+    result = tools.get_usuarios(limit=1)
+    assert result["pagination"] == {"page": 1, "limit": 1, "has_more": True}
+
+
+def test_whole_list_falls_back_when_the_field_is_not_paginated(monkeypatch):
+    class Client:
+        def paginate(self, *args, **kwargs):
+            raise GraphQLClientError(
+                f"Failed to execute GraphQL query: {UNKNOWN_LIMIT}"
+            )
+
+        def execute_stream(self, query, field, variables=None):
+            assert "$limit" not in query
+            yield {"id": 1}
+
+    monkeypatch.setattr(tools, "get_client", lambda: Client())
+    monkeypatch.setattr(tools, "_unpaginated_fields", set())
+    assert tools.get_citas() == {"data": {"citas": [{"id": 1}]}}
+    assert tools._unpaginated_fields == {"citas"}
+
+
+def test_unpaginated_lists_are_streamed(monkeypatch):
+    streamed = []
+
+    class Client:
+        def execute_stream(self, query, field, variables=None):
+            streamed.append((field, variables))
+            yield from [{"id": "1"}, {"id": "2"}]
+
+    monkeypatch.setattr(tools, "get_client", lambda: Client())
+    monkeypatch.setattr(tools, "_unpaginated_fields", {"citasPorMedico"})
+    result = tools.get_citas_por_medico("5")
+    assert result == {"data": {"citasPorMedico": [{"id": "1"}, {"id": "2"}]}}
+    assert streamed == [("citasPorMedico", {"medicoId": "5"})]
+
+
+def test_other_errors_keep_server_pagination(monkeypatch):
+    denied = {"errors": [{"message": "Unauthorized"}], "data": None}
+    monkeypatch.setattr(tools, "execute_graphql_query", lambda q, v=None: denied)
+    monkeypatch.setattr(tools, "_unpaginated_fields", set())
+    assert tools.get_usuarios(limit=10) == denied
+    assert not tools._unpaginated_fields